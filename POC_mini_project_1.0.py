@@ -3,12 +3,40 @@ This module contains a function that merges a single row
 or column in 2048.
 """
 
-def merge(line):
+# NumPy is only needed for merging many lines at once
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Width of a standard 2048 line and the number of bits used
+# to store a single tile exponent in a packed line
+TABLE_WIDTH = 4
+TILE_BITS = 4
+TILE_MASK = (1 << TILE_BITS) - 1
+
+# Maps every tile value that fits in a packed line to its
+# exponent, with the empty tile stored as exponent zero
+TILE_EXPONENTS = dict((2 ** exponent, exponent) for exponent in range(1, TILE_MASK + 1))
+TILE_EXPONENTS[0] = 0
+
+# Set to False to always use the scanning merge
+USE_MERGE_TABLE = True
+
+# Lookup table keyed on the tuple of tiles of every line of
+# TABLE_WIDTH tiles that fits in a packed line. Every entry
+# holds the merged line and the score gained by the merge,
+# lines whose merged line no longer fits in a packed line
+# are left out. The table is built on the first lookup.
+MERGE_TABLE = {}
+
+def scan_merge(line):
     """
     This function merges a single row or column in 2048.
     Takes a list of numbers, sorts them, and merges them
-    as according to 2048 rules and returns the list of
-    merged numbers the same length as the input line.
+    as according to 2048 rules and returns a tuple of the
+    list of merged numbers the same length as the input
+    line and the score gained by the merge.
     """
 
     # The sorting step
@@ -35,6 +63,7 @@ def merge(line):
     
     # Merges the sorted non-zero elements to the list
     idx = 0
+    merge_score = 0
     for dummy_line in sorted_list:
         if not dummy_line == 0:
             
@@ -49,6 +78,7 @@ def merge(line):
             # next element by incrementing the index
             elif new_list[idx] == dummy_line:
                 new_list[idx] = 2 * dummy_line
+                merge_score += 2 * dummy_line
                 idx += 1
                 
             # If sorted element is not equal to the one in
@@ -58,4 +88,120 @@ def merge(line):
                 idx += 1
                 new_list[idx] = dummy_line
                 
-    return new_list
+    return new_list, merge_score
+
+def encode_line(line):
+    """
+    Packs a line of tile values into a single integer with
+    the exponent of each tile stored in TILE_BITS bits, the
+    first tile in the lowest bits. Returns None if a tile
+    cannot be stored in a packed line.
+    """
+    packed = 0
+    shift = 0
+    for tile in line:
+        exponent = TILE_EXPONENTS.get(tile)
+        if exponent is None:
+            return None
+        packed |= exponent << shift
+        shift += TILE_BITS
+    return packed
+
+def decode_line(packed, width):
+    """
+    Unpacks a packed line of exponents back into a list of
+    tile values of the given width.
+    """
+    line = []
+    for dummy_idx in range(width):
+        exponent = packed & TILE_MASK
+        if exponent == 0:
+            line.append(0)
+        else:
+            line.append(1 << exponent)
+        packed >>= TILE_BITS
+    return line
+
+def build_merge_table():
+    """
+    Precomputes the merged line and score for every possible
+    packed line of TABLE_WIDTH tiles.
+    """
+    merge_table = {}
+    for packed in range(1 << (TILE_BITS * TABLE_WIDTH)):
+        line = decode_line(packed, TABLE_WIDTH)
+        merged, merge_score = scan_merge(line)
+        
+        # Two of the largest tiles merge into a tile that
+        # does not fit, those lines are left to the scan
+        if encode_line(merged) is not None:
+            merge_table[tuple(line)] = (tuple(merged), merge_score)
+    MERGE_TABLE.update(merge_table)
+
+def merge_with_score(line):
+    """
+    Merges a single row or column in 2048 and returns a tuple
+    of the merged line and the score gained by the merge.
+    Standard width lines are answered from the precomputed
+    table, any other line falls back to the scanning merge.
+    """
+    if USE_MERGE_TABLE and len(line) == TABLE_WIDTH:
+        if not MERGE_TABLE:
+            build_merge_table()
+        entry = MERGE_TABLE.get(tuple(line))
+        if entry is not None:
+            return list(entry[0]), entry[1]
+    return scan_merge(line)
+
+def merge(line):
+    """
+    This function merges a single row or column in 2048.
+    Takes a list of numbers, sorts them, and merges them
+    as according to 2048 rules and returns the list of
+    merged numbers the same length as the input line.
+    """
+    return merge_with_score(line)[0]
+
+def compact_lines(lines):
+    """
+    Slides the non-zero tiles of every row of a 2D array to
+    the front, keeping their order.
+    """
+    order = np.argsort(lines == 0, axis=1, kind='mergesort')
+    return lines[np.arange(lines.shape[0])[:, np.newaxis], order]
+
+def merge_many(lines):
+    """
+    Merges every row of an N x L integer array of lines at
+    once with vectorized operations.
+    
+    Returns a tuple of the N x L array of merged lines, an
+    array of N booleans that are True where the line changed
+    and an array of the N scores gained by the merges.
+    """
+    if np is None:
+        raise ImportError("merge_many requires NumPy")
+    
+    lines = np.asarray(lines)
+    compacted = compact_lines(lines)
+    
+    # Marks the tiles that merge into the tile before them,
+    # within a run of equal tiles the pairs are taken from
+    # the front so a tile only merges once
+    merges_back = np.zeros(compacted.shape, dtype=bool)
+    for idx in range(1, compacted.shape[1]):
+        merges_back[:, idx] = ((compacted[:, idx] == compacted[:, idx - 1]) &
+                               (compacted[:, idx] != 0) &
+                               ~merges_back[:, idx - 1])
+    
+    # Doubles every tile that receives a merge and empties
+    # the tile that was merged into it
+    receives = np.zeros(compacted.shape, dtype=bool)
+    receives[:, :-1] = merges_back[:, 1:]
+    merged = np.where(receives, 2 * compacted, compacted)
+    merged[merges_back] = 0
+    merged = compact_lines(merged)
+    
+    changed = np.any(merged != lines, axis=1)
+    scores = np.where(receives, 2 * compacted, 0).sum(axis=1)
+    return merged, changed, scores
@@ -8,6 +8,22 @@ This module plays the full 2048 game
 # Import the test suite and random library
 import poc_2048_gui
 import random
+import time
+
+# The process pool is only needed by the headless runner
+try:
+    import multiprocessing
+except ImportError:
+    multiprocessing = None
+
+# Memory maps and packed records are only needed by the
+# binary game logs
+try:
+    import mmap
+    import struct
+except ImportError:
+    mmap = None
+    struct = None
 
 # Directions
 UP = 1
@@ -21,13 +37,36 @@ OFFSETS = {UP: (1, 0),
            LEFT: (0, 1),
            RIGHT: (0, -1)}
 
+# Bitboard layout for 4x4 games: every tile is stored as its
+# exponent in 4 bits of a single integer, tile (row, col) at
+# bit 4 * (4 * row + col) so each row is 16 contiguous bits
+BITBOARD_SIZE = 4
+TILE_BITS = 4
+TILE_MASK = (1 << TILE_BITS) - 1
+ROW_BITS = TILE_BITS * BITBOARD_SIZE
+ROW_MASK = (1 << ROW_BITS) - 1
+
+# Maps every tile value that fits in 4 bits to its exponent
+TILE_EXPONENTS = dict((2 ** exponent, exponent) for exponent in range(1, TILE_MASK + 1))
+TILE_EXPONENTS[0] = 0
+TILE_VALUES = [0] + [2 ** exponent for exponent in range(1, TILE_MASK + 1)]
+
+# Row lookup tables indexed by a packed row, holding the
+# packed row after moving left or right and the score of the
+# merge. Built the first time a bitboard game is created.
+ROW_LEFT = []
+ROW_RIGHT = []
+ROW_SCORE = []
+
 # Helper function
-def merge(line):
+def merge_with_changes(line):
     """
     This function merges a single row or column in 2048.
     Takes a list of numbers, sorts them, and merges them
-    as according to 2048 rules and returns the list of
-    merged numbers the same length as the input line.
+    as according to 2048 rules and returns a tuple of the
+    list of merged numbers the same length as the input
+    line, the score gained by the merge and whether the
+    merged line differs from the input line.
     """
 
     # The sorting step
@@ -37,11 +76,14 @@ def merge(line):
         sorted_list.append(0)
         
     # Sorts non-zero elements into the a new intermediate
-    # list
+    # list, the line changes if any of them slides forward
     idx = 0
-    for dummy_line in line:
+    changed = False
+    for position, dummy_line in enumerate(line):
         if not dummy_line == 0:
             sorted_list[idx] = dummy_line
+            if idx != position:
+                changed = True
             idx += 1
     
     # The merging step
@@ -54,6 +96,7 @@ def merge(line):
     
     # Merges the sorted non-zero elements to the list
     idx = 0
+    merge_score = 0
     for dummy_line in sorted_list:
         if not dummy_line == 0:
             
@@ -68,6 +111,8 @@ def merge(line):
             # next element by incrementing the index
             elif new_list[idx] == dummy_line:
                 new_list[idx] = 2 * dummy_line
+                merge_score += 2 * dummy_line
+                changed = True
                 idx += 1
                 
             # If sorted element is not equal to the one in
@@ -77,17 +122,143 @@ def merge(line):
                 idx += 1
                 new_list[idx] = dummy_line
                 
-    return new_list
+    return new_list, merge_score, changed
+
+def merge(line):
+    """
+    This function merges a single row or column in 2048
+    and returns the list of merged numbers.
+    """
+    return merge_with_changes(line)[0]
+
+def reverse_row(row):
+    """
+    Reverses the order of the tiles in a packed row.
+    """
+    return (((row & 0xF) << 12) | ((row & 0xF0) << 4) |
+            ((row >> 4) & 0xF0) | ((row >> 12) & 0xF))
+
+def build_row_tables():
+    """
+    Precomputes the result of moving every possible packed
+    row to the left and to the right, and the score of the
+    merge. Tiles of the largest exponent do not merge since
+    their sum does not fit in 4 bits.
+    """
+    row_left = [0] * (1 << ROW_BITS)
+    row_right = [0] * (1 << ROW_BITS)
+    row_score = [0] * (1 << ROW_BITS)
+    for row in range(1 << ROW_BITS):
+        
+        # Slides the non-empty exponents to the front
+        exponents = []
+        for step in range(BITBOARD_SIZE):
+            exponent = (row >> (step * TILE_BITS)) & TILE_MASK
+            if exponent != 0:
+                exponents.append(exponent)
+        
+        # Merges pairs of equal exponents from the front
+        merged_row = 0
+        merge_score = 0
+        shift = 0
+        idx = 0
+        while idx < len(exponents):
+            exponent = exponents[idx]
+            if (idx + 1 < len(exponents) and exponents[idx + 1] == exponent
+                and exponent != TILE_MASK):
+                exponent += 1
+                merge_score += 1 << exponent
+                idx += 1
+            merged_row |= exponent << shift
+            shift += TILE_BITS
+            idx += 1
+        
+        # Moving right is moving the reversed row left, and
+        # equal runs give the same score in either direction
+        row_left[row] = merged_row
+        row_right[reverse_row(row)] = reverse_row(merged_row)
+        row_score[row] = merge_score
+    
+    ROW_LEFT[:] = row_left
+    ROW_RIGHT[:] = row_right
+    ROW_SCORE[:] = row_score
+
+def transpose_board(board):
+    """
+    Transposes a 4x4 bitboard so that columns become rows.
+    """
+    part_1 = board & 0xF0F00F0FF0F00F0F
+    part_2 = board & 0x0000F0F00000F0F0
+    part_3 = board & 0x0F0F00000F0F0000
+    board = part_1 | (part_2 << 12) | (part_3 >> 12)
+    part_1 = board & 0xFF00FF0000FF00FF
+    part_2 = board & 0x00FF00FF00000000
+    part_3 = board & 0x00000000FF00FF00
+    return part_1 | (part_2 >> 24) | (part_3 << 24)
+
+def move_board(board, direction):
+    """
+    Moves every tile of a 4x4 bitboard in the given direction
+    with one table lookup per row and returns a tuple of the
+    new board and the score gained by the move.
+    """
+    if (direction == UP) or (direction == DOWN):
+        board = transpose_board(board)
+    if (direction == UP) or (direction == LEFT):
+        row_table = ROW_LEFT
+    else:
+        row_table = ROW_RIGHT
+    
+    row_0 = board & ROW_MASK
+    row_1 = (board >> ROW_BITS) & ROW_MASK
+    row_2 = (board >> (2 * ROW_BITS)) & ROW_MASK
+    row_3 = (board >> (3 * ROW_BITS)) & ROW_MASK
+    new_board = (row_table[row_0] |
+                 (row_table[row_1] << ROW_BITS) |
+                 (row_table[row_2] << (2 * ROW_BITS)) |
+                 (row_table[row_3] << (3 * ROW_BITS)))
+    move_score = ROW_SCORE[row_0] + ROW_SCORE[row_1] + ROW_SCORE[row_2] + ROW_SCORE[row_3]
+    
+    if (direction == UP) or (direction == DOWN):
+        new_board = transpose_board(new_board)
+    return new_board, move_score
 
 class TwentyFortyEight:
     """
     Class to run the game logic.
     """
     
-    def __init__(self, grid_height, grid_width):
+    def __init__(self, grid_height, grid_width, use_bitboard=False, rng=None):
         self._grid_height = grid_height
         self._grid_width = grid_width
         self._tiles = [[0] * self._grid_width for dummy_height in range(self._grid_height)]
+        self._score = 0
+        
+        # Tiles are spawned from the random module unless the
+        # game is given its own random number generator
+        if rng is None:
+            self._rng = random
+        else:
+            self._rng = rng
+        
+        # Only 4x4 games can be packed into a bitboard, every
+        # other size keeps the list of lists
+        self._use_bitboard = (use_bitboard and grid_height == BITBOARD_SIZE
+                              and grid_width == BITBOARD_SIZE)
+        self._board = 0
+        if self._use_bitboard and not ROW_LEFT:
+            build_row_tables()
+        
+        # The list backend keeps its empty tiles in a list for
+        # constant time random picks, with the index of every
+        # empty tile in that list for constant time removal
+        self._empty_tiles = []
+        self._empty_index = {}
+        self._reset_empty_tiles()
+        
+        # Receives every move and spawned tile when the game
+        # is being recorded
+        self._recorder = None
         
         # Pre-compute the list of initial tiles for each
         # directions
@@ -108,8 +279,9 @@ class TwentyFortyEight:
         debugging arranged by rows.
         """
         tile_string = ''
-        for dummy_tile_row in self._tiles:
-            tile_string = str(dummy_tile_row) + "\n"
+        for row in range(self._grid_height):
+            tile_row = [self.get_tile(row, col) for col in range(self._grid_width)]
+            tile_string += str(tile_row) + "\n"
         return tile_string
     
     def tile_initial_string(self):
@@ -140,8 +312,32 @@ class TwentyFortyEight:
         placed tiles.
         """
         self._tiles = [[0] * self._grid_width for dummy_height in range(self._grid_height)]
+        self._board = 0
+        self._score = 0
+        self._reset_empty_tiles()
+        if self._recorder is not None:
+            self._recorder.start_game(self._grid_height, self._grid_width)
         self.new_tile()
         self.new_tile()
+    
+    def _reset_empty_tiles(self):
+        """
+        Marks every tile of the list backend as empty.
+        """
+        self._empty_tiles = [(row, col) for row in range(self._grid_height)
+                             for col in range(self._grid_width)]
+        self._empty_index = dict((tile, idx) for idx, tile in enumerate(self._empty_tiles))
+    
+    def _fill_empty_tile(self, row, col):
+        """
+        Removes a tile from the empty tiles by moving the last
+        empty tile into its place.
+        """
+        idx = self._empty_index.pop((row, col))
+        last_tile = self._empty_tiles.pop()
+        if idx < len(self._empty_tiles):
+            self._empty_tiles[idx] = last_tile
+            self._empty_index[last_tile] = idx
         
     def new_tile(self):
         """
@@ -150,25 +346,34 @@ class TwentyFortyEight:
         
         # Searches the entire column for every empty grid
         # and the stores the location of at which row and 
-        # column to a list
-        empty_tile_coordinates = []
-        for row in range(self._grid_height):
-            for col in range(self._grid_width):
-                if (self._tiles[row][col] == 0):
-                    empty_tile_coordinates.append([row, col])
+        # column to a list, the list backend already keeps
+        # track of its empty tiles
+        if self._use_bitboard:
+            empty_tile_coordinates = []
+            board = self._board
+            for row in range(self._grid_height):
+                for col in range(self._grid_width):
+                    if (board & TILE_MASK == 0):
+                        empty_tile_coordinates.append([row, col])
+                    board >>= TILE_BITS
+        else:
+            empty_tile_coordinates = self._empty_tiles
         
         # Choses the coordinates of empty tiles randomly
         # from the list of empty tiles obtained previously
         empty_tile_length = len(empty_tile_coordinates)
-        empty_tile_idx = random.randrange(empty_tile_length)
-        [row, col] = empty_tile_coordinates[empty_tile_idx]
+        empty_tile_idx = self._rng.randrange(empty_tile_length)
+        row, col = empty_tile_coordinates[empty_tile_idx]
         
         # Stores a either 2 or 4 in the randomly chosen tile
         # Stores 2 90% of the time and 4 10% of the time
-        if (random.randrange(0, 10) == 0):
-            self.set_tile(row, col, 4)
+        if (self._rng.randrange(0, 10) == 0):
+            value = 4
         else:
-            self.set_tile(row, col, 2)
+            value = 2
+        self.set_tile(row, col, value)
+        if self._recorder is not None:
+            self._recorder.record_spawn(row, col, value)
         
     def get_grid_height(self):
         """
@@ -182,58 +387,751 @@ class TwentyFortyEight:
         """
         return self._grid_width
     
+    def get_score(self):
+        """
+        Returns the sum of the tiles created by merges since
+        the last reset.
+        """
+        return self._score
+    
+    def set_recorder(self, recorder):
+        """
+        Records the moves and spawned tiles of every game
+        started by reset with a GameRecorder, or stops
+        recording if recorder is None.
+        """
+        self._recorder = recorder
+    
     def move(self, direction):
         """
         Move all tiles in a given direction and add new
-        tiles if any tiles moved.
+        tiles if any tiles moved. Returns True if any tiles
+        moved.
+        """
+        if self._recorder is not None:
+            self._recorder.record_move(direction)
+        tiles_moved = self._slide(direction)
+        if tiles_moved:
+            self.new_tile()
+        return tiles_moved
+    
+    def _slide(self, direction):
         """
+        Moves all tiles in a given direction without spawning a
+        new tile. Returns True if any tiles moved.
+        """
+        
+        # On a bitboard every row is moved by a table lookup
+        if self._use_bitboard:
+            new_board, move_score = move_board(self._board, direction)
+            if new_board == self._board:
+                return False
+            self._board = new_board
+            self._score += move_score
+            return True
         
         # Calls the precomputed list of initial tiles
         # to be used in merging
         start_cell_array = self._tiles_dictionary[direction]
         direct = OFFSETS[direction]
-        previous_tile_list = [list(tile_row) for tile_row in self._tiles]
+        num_steps = self._get_num_steps(direction)
+        tiles_moved = False
+        
+        # Scans the tiles from the initial tiles
+        # gets the value from the tiles
+        for start_cell in start_cell_array:
+            merge_list = self._get_line(start_cell, direct, num_steps)
+            
+            # Rewrites the tiles of the lines that changed with
+            # the merged list one
+            merged_list, merge_score, changed = merge_with_changes(merge_list)
+            if changed:
+                tiles_moved = True
+                self._score += merge_score
+                for step, value in enumerate(merged_list):
+                    if value != merge_list[step]:
+                        row = start_cell[0] + step * direct[0]
+                        col = start_cell[1] + step * direct[1]
+                        self.set_tile(row, col, value)
+                
+        return tiles_moved
+    
+    def _get_num_steps(self, direction):
+        """
+        Returns the length of the lines merged in a direction.
+        """
         
         # If traversing in either vertical direction
         # Set the limits of steps to be the height
         # If horizontal direction set the limit to be
         # the width
         if (direction == UP) or (direction == DOWN):
-            num_steps = self._grid_height
-        else:
-            num_steps = self._grid_width
+            return self._grid_height
+        return self._grid_width
+    
+    def _get_line(self, start_cell, direct, num_steps):
+        """
+        Returns the list of tiles of the line that starts at a
+        given initial tile and steps by the given offset.
+        """
+        merge_list = []
+        for step in range(num_steps):
+            row = start_cell[0] + step * direct[0]
+            col = start_cell[1] + step * direct[1]
+            merge_list.append(self.get_tile(row, col))
+        return merge_list
+    
+    def preview(self, direction):
+        """
+        Returns a tuple of the grid of tiles, as a list of rows,
+        and the score gained if all tiles were moved in a given
+        direction. The game itself is left unchanged and no new
+        tile is spawned.
+        """
+        if self._use_bitboard:
+            new_board, move_score = move_board(self._board, direction)
+            grid = []
+            for dummy_row in range(self._grid_height):
+                grid_row = []
+                for dummy_col in range(self._grid_width):
+                    grid_row.append(TILE_VALUES[new_board & TILE_MASK])
+                    new_board >>= TILE_BITS
+                grid.append(grid_row)
+            return grid, move_score
         
-        # Scans the tiles from the initial tiles
-        # gets the value from the tiles
-        for start_cell in start_cell_array:
-            merge_list = []
-            for step in range(num_steps):
-                row = start_cell[0] + step * direct[0]
-                col = start_cell[1] + step * direct[1]
-                merge_list.append(self.get_tile(row, col))
-            
-            # Rewrites the tiles with the merged list one
-            for step, value in list(enumerate(merge(merge_list))):
-                row = start_cell[0] + step * direct[0]
-                col = start_cell[1] + step * direct[1]
-                self.set_tile(row, col, value)
-                
-        if not previous_tile_list == self._tiles:
-            self.new_tile()
+        grid = [list(tile_row) for tile_row in self._tiles]
+        direct = OFFSETS[direction]
+        num_steps = self._get_num_steps(direction)
+        move_score = 0
+        for start_cell in self._tiles_dictionary[direction]:
+            merged_list, merge_score, changed = merge_with_changes(
+                self._get_line(start_cell, direct, num_steps))
+            if changed:
+                move_score += merge_score
+                for step, value in enumerate(merged_list):
+                    grid[start_cell[0] + step * direct[0]][start_cell[1] + step * direct[1]] = value
+        return grid, move_score
+    
+    def is_legal_move(self, direction):
+        """
+        Returns True if moving in a given direction would move
+        any tiles, stopping at the first line that changes.
+        """
+        if self._use_bitboard:
+            return move_board(self._board, direction)[0] != self._board
+        
+        direct = OFFSETS[direction]
+        num_steps = self._get_num_steps(direction)
+        for start_cell in self._tiles_dictionary[direction]:
+            if merge_with_changes(self._get_line(start_cell, direct, num_steps))[2]:
+                return True
+        return False
+    
+    def legal_moves(self):
+        """
+        Returns the list of directions that would move any tiles.
+        """
+        return [direction for direction in (UP, DOWN, LEFT, RIGHT)
+                if self.is_legal_move(direction)]
+    
+    def is_game_over(self):
+        """
+        Returns True if no move would move any tiles.
+        """
+        
+        # Some tile can always slide into an empty tile
+        if self._use_bitboard:
+            board = self._board
+            for dummy_tile in range(BITBOARD_SIZE * BITBOARD_SIZE):
+                if board & TILE_MASK == 0:
+                    return False
+                board >>= TILE_BITS
+        elif self._empty_tiles:
+            return False
+        
+        # On a full grid only merges move tiles, and a pair that
+        # merges one way also merges the opposite way
+        return not (self.is_legal_move(LEFT) or self.is_legal_move(UP))
     
     def set_tile(self, row, col, value):
         """
         Set the tile at a certain row and column position
         to be of a given value.
         """
-        self._tiles[row][col] = value
+        if self._use_bitboard:
+            shift = TILE_BITS * (BITBOARD_SIZE * row + col)
+            self._board = ((self._board & ~(TILE_MASK << shift)) |
+                           (TILE_EXPONENTS[value] << shift))
+        else:
+            
+            # Keeps the empty tiles up to date
+            previous_value = self._tiles[row][col]
+            if previous_value == 0 and value != 0:
+                self._fill_empty_tile(row, col)
+            elif previous_value != 0 and value == 0:
+                self._empty_index[(row, col)] = len(self._empty_tiles)
+                self._empty_tiles.append((row, col))
+            self._tiles[row][col] = value
     
     def get_tile(self, row, col):
         """
         Return the value of the tile at a certain position
         """
+        if self._use_bitboard:
+            return TILE_VALUES[(self._board >> (TILE_BITS * (BITBOARD_SIZE * row + col))) & TILE_MASK]
         return self._tiles[row][col]
 
+# Headless runner for batch experiments
+
+def random_policy(game, rng):
+    """
+    Move policy that picks one of the four directions at
+    random. A policy takes the game and a random number
+    generator and returns the direction to move.
+    """
+    return rng.choice((UP, DOWN, LEFT, RIGHT))
+
+def play_headless_game(game_args):
+    """
+    Plays one complete game without the GUI. Takes a tuple of
+    the game index, the policy, the grid size, whether to use
+    the bitboard and the seed of the game.
+    
+    Returns a dictionary with the game index, the maximum
+    tile, the score, the number of moves that moved tiles
+    and the wall time of the game in seconds.
+    """
+    game_idx, policy, grid_height, grid_width, use_bitboard, seed = game_args
+    start_time = time.time()
+    
+    # Every game gets its own generator so the results do
+    # not depend on which worker plays it
+    rng = random.Random(seed)
+    game = TwentyFortyEight(grid_height, grid_width, use_bitboard, rng)
+    game.reset()
+    
+    num_moves = 0
+    while not game.is_game_over():
+        if game.move(policy(game, rng)):
+            num_moves += 1
+    
+    max_tile = 0
+    for row in range(grid_height):
+        for col in range(grid_width):
+            max_tile = max(max_tile, game.get_tile(row, col))
+    
+    return {'game': game_idx,
+            'max_tile': max_tile,
+            'score': game.get_score(),
+            'moves': num_moves,
+            'time': time.time() - start_time}
+
+def run_games(num_games, policy=random_policy, grid_height=4, grid_width=4,
+              use_bitboard=True, processes=None, seed=0):
+    """
+    Generator that plays num_games complete games across a
+    process pool and yields the result of every game as soon
+    as it finishes. Game i is seeded with seed + i. Runs in
+    this process if processes is 1 or there is no process
+    pool available.
+    """
+    game_args = [(game_idx, policy, grid_height, grid_width, use_bitboard, seed + game_idx)
+                 for game_idx in range(num_games)]
+    
+    if processes == 1 or multiprocessing is None:
+        for args in game_args:
+            yield play_headless_game(args)
+        return
+    
+    pool = multiprocessing.Pool(processes)
+    try:
+        for result in pool.imap_unordered(play_headless_game, game_args):
+            yield result
+    finally:
+        pool.close()
+        pool.join()
+
+def run_experiment(num_games, policy=random_policy, grid_height=4, grid_width=4,
+                   use_bitboard=True, processes=None, seed=0, verbose=True):
+    """
+    Plays num_games headless games, printing every result as
+    it arrives if verbose, and returns a dictionary of the
+    aggregate statistics and throughput.
+    """
+    start_time = time.time()
+    total_moves = 0
+    total_score = 0
+    best_tile = 0
+    for result in run_games(num_games, policy, grid_height, grid_width,
+                            use_bitboard, processes, seed):
+        total_moves += result['moves']
+        total_score += result['score']
+        best_tile = max(best_tile, result['max_tile'])
+        if verbose:
+            print "Game", result['game'], "max tile", result['max_tile'], \
+                  "score", result['score'], "moves", result['moves'], \
+                  "time", result['time']
+    wall_time = max(time.time() - start_time, 1e-9)
+    
+    return {'games': num_games,
+            'moves': total_moves,
+            'mean_score': float(total_score) / max(num_games, 1),
+            'best_tile': best_tile,
+            'wall_time': wall_time,
+            'games_per_second': num_games / wall_time,
+            'moves_per_second': total_moves / wall_time}
+
+# Binary game logs
+#
+# A log is a stream of games followed by an index. Every game
+# starts with its grid height and width in one byte each and
+# is followed by one record per event: a move is one byte with
+# the high bit set and the direction in the low bits, a spawn
+# is the tile position times two plus one for a 4, in one byte
+# for grids of up to 64 tiles and two big endian bytes
+# otherwise. The index holds the offset and number of moves of
+# every game and the offset of every LOG_CHECKPOINT_MOVES-th
+# move, so any game or move can be found without parsing the
+# events before it.
+
+LOG_MAGIC = '2048'
+LOG_MOVE_FLAG = 0x80
+LOG_SHORT_SPAWN_TILES = 64
+LOG_CHECKPOINT_MOVES = 256
+LOG_FLUSH_BYTES = 1 << 16
+
+# Struct formats of the index entry of a game: offset, number
+# of moves and index of its first checkpoint, of a checkpoint
+# and of the footer, which holds the offset and length of the
+# game table and of the checkpoint table.
+LOG_GAME_ENTRY = '<QII'
+LOG_CHECKPOINT_ENTRY = '<Q'
+LOG_FOOTER = '<QQQQ4s'
+
+class GameRecorder:
+    """
+    Writes the moves and spawned tiles of many games to a
+    binary log, attach it to a game with set_recorder.
+    """
+    
+    def __init__(self, path):
+        """
+        Creates a recorder that writes a new log at path.
+        """
+        if struct is None:
+            raise ImportError("the game log requires struct")
+        self._file = open(path, 'wb')
+        self._buffer = bytearray()
+        self._offset = 0
+        self._games = []
+        self._checkpoints = []
+        self._num_moves = 0
+        self._spawn_tiles = 0
+        self._grid_width = 0
+    
+    def start_game(self, grid_height, grid_width):
+        """
+        Starts recording a new game of the given size.
+        """
+        self._end_game()
+        self._games.append([self._offset + len(self._buffer), 0, len(self._checkpoints)])
+        self._num_moves = 0
+        self._grid_width = grid_width
+        self._spawn_tiles = grid_height * grid_width
+        self._buffer.append(grid_height)
+        self._buffer.append(grid_width)
+    
+    def record_move(self, direction):
+        """
+        Records a direction passed to move.
+        """
+        if self._num_moves % LOG_CHECKPOINT_MOVES == 0:
+            self._checkpoints.append(self._offset + len(self._buffer))
+        self._num_moves += 1
+        self._buffer.append(LOG_MOVE_FLAG | direction)
+        if len(self._buffer) >= LOG_FLUSH_BYTES:
+            self._flush()
+    
+    def record_spawn(self, row, col, value):
+        """
+        Records a tile placed by new_tile.
+        """
+        spawn = 2 * (row * self._grid_width + col) + (value == 4)
+        if self._spawn_tiles > LOG_SHORT_SPAWN_TILES:
+            self._buffer.append(spawn >> 8)
+            self._buffer.append(spawn & 0xFF)
+        else:
+            self._buffer.append(spawn)
+    
+    def close(self):
+        """
+        Writes the index and closes the log.
+        """
+        self._end_game()
+        games_offset = self._offset + len(self._buffer)
+        for game_entry in self._games:
+            self._buffer.extend(struct.pack(LOG_GAME_ENTRY, *game_entry))
+        checkpoints_offset = self._offset + len(self._buffer)
+        for checkpoint in self._checkpoints:
+            self._buffer.extend(struct.pack(LOG_CHECKPOINT_ENTRY, checkpoint))
+        self._buffer.extend(struct.pack(LOG_FOOTER, games_offset, len(self._games),
+                                        checkpoints_offset, len(self._checkpoints),
+                                        LOG_MAGIC))
+        self._flush()
+        self._file.close()
+    
+    def _end_game(self):
+        """
+        Stores the number of moves of the current game.
+        """
+        if self._games:
+            self._games[-1][1] = self._num_moves
+    
+    def _flush(self):
+        """
+        Writes the buffered bytes to the file.
+        """
+        self._file.write(self._buffer)
+        self._offset += len(self._buffer)
+        self._buffer = bytearray()
+
+class GameLogReader:
+    """
+    Reads a binary log written by GameRecorder through a
+    memory map.
+    """
+    
+    def __init__(self, path):
+        """
+        Maps the log at path and reads its footer.
+        """
+        if mmap is None:
+            raise ImportError("the game log requires mmap and struct")
+        self._file = open(path, 'rb')
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (self._games_offset, self._num_games, self._checkpoints_offset,
+         dummy_num_checkpoints, magic) = struct.unpack_from(
+             LOG_FOOTER, self._data, len(self._data) - struct.calcsize(LOG_FOOTER))
+        assert magic == LOG_MAGIC, "not a 2048 game log"
+    
+    def close(self):
+        """
+        Unmaps and closes the log.
+        """
+        self._data.close()
+        self._file.close()
+    
+    def num_games(self):
+        """
+        Returns the number of games in the log.
+        """
+        return self._num_games
+    
+    def _game_entry(self, game_idx):
+        """
+        Returns the offset, number of moves and first checkpoint
+        of a game.
+        """
+        return struct.unpack_from(LOG_GAME_ENTRY, self._data, self._games_offset +
+                                  game_idx * struct.calcsize(LOG_GAME_ENTRY))
+    
+    def _game_end(self, game_idx):
+        """
+        Returns the offset just past the events of a game.
+        """
+        if game_idx + 1 < self._num_games:
+            return self._game_entry(game_idx + 1)[0]
+        return self._games_offset
+    
+    def get_grid_size(self, game_idx):
+        """
+        Returns the grid height and width of a game.
+        """
+        offset = self._game_entry(game_idx)[0]
+        return ord(self._data[offset]), ord(self._data[offset + 1])
+    
+    def num_moves(self, game_idx):
+        """
+        Returns the number of moves recorded in a game.
+        """
+        return self._game_entry(game_idx)[1]
+    
+    def _read_spawns(self, offset, end, grid_width, spawn_bytes):
+        """
+        Reads the spawns starting at offset up to the next move.
+        Returns the list of spawns as (row, col, value) tuples
+        and the offset after them.
+        """
+        spawns = []
+        while offset < end and not ord(self._data[offset]) & LOG_MOVE_FLAG:
+            if spawn_bytes == 2:
+                spawn = (ord(self._data[offset]) << 8) | ord(self._data[offset + 1])
+            else:
+                spawn = ord(self._data[offset])
+            offset += spawn_bytes
+            row, col = divmod(spawn >> 1, grid_width)
+            spawns.append((row, col, 4 if spawn & 1 else 2))
+        return spawns, offset
+    
+    def initial_spawns(self, game_idx):
+        """
+        Returns the tiles spawned by reset before the first
+        move of a game as (row, col, value) tuples.
+        """
+        offset = self._game_entry(game_idx)[0]
+        grid_height, grid_width = self.get_grid_size(game_idx)
+        spawn_bytes = 2 if grid_height * grid_width > LOG_SHORT_SPAWN_TILES else 1
+        return self._read_spawns(offset + 2, self._game_end(game_idx),
+                                 grid_width, spawn_bytes)[0]
+    
+    def iter_moves(self, game_idx, start_move=0):
+        """
+        Generator that yields the moves of a game from move
+        start_move on as (direction, spawn) tuples, where spawn
+        is the (row, col, value) of the tile spawned after the
+        move or None if the move did not move any tiles.
+        """
+        offset, num_moves, first_checkpoint = self._game_entry(game_idx)
+        end = self._game_end(game_idx)
+        grid_height, grid_width = self.get_grid_size(game_idx)
+        spawn_bytes = 2 if grid_height * grid_width > LOG_SHORT_SPAWN_TILES else 1
+        
+        # Jumps to the last checkpoint at or before start_move
+        # and skips the moves up to start_move
+        move_idx = start_move - start_move % LOG_CHECKPOINT_MOVES
+        if move_idx >= num_moves:
+            return
+        offset = struct.unpack_from(
+            LOG_CHECKPOINT_ENTRY, self._data, self._checkpoints_offset +
+            (first_checkpoint + move_idx // LOG_CHECKPOINT_MOVES) *
+            struct.calcsize(LOG_CHECKPOINT_ENTRY))[0]
+        
+        while move_idx < num_moves:
+            direction = ord(self._data[offset]) & ~LOG_MOVE_FLAG
+            spawns, offset = self._read_spawns(offset + 1, end, grid_width, spawn_bytes)
+            if move_idx >= start_move:
+                if spawns:
+                    yield direction, spawns[0]
+                else:
+                    yield direction, None
+            move_idx += 1
+
+def replay_game(reader, game_idx, use_bitboard=False):
+    """
+    Rebuilds a recorded game by applying its logged moves and
+    spawned tiles and returns the game in its final state.
+    """
+    grid_height, grid_width = reader.get_grid_size(game_idx)
+    game = TwentyFortyEight(grid_height, grid_width, use_bitboard)
+    for row, col, value in reader.initial_spawns(game_idx):
+        game.set_tile(row, col, value)
+    for direction, spawn in reader.iter_moves(game_idx):
+        game._slide(direction)
+        if spawn is not None:
+            game.set_tile(spawn[0], spawn[1], spawn[2])
+    return game
+
+# Expectimax player
+
+# Weights of the static evaluation of a row, the board is
+# scored as the sum over its rows and columns
+HEUR_BASE = 200000.0
+HEUR_EMPTY = 270.0
+HEUR_MERGES = 700.0
+HEUR_MONOTONIC = 47.0
+HEUR_MONOTONIC_POWER = 4.0
+
+# Row heuristic table indexed by a packed row, built the
+# first time an expectimax player is created
+ROW_HEURISTIC = []
+
+# Probabilities of the tiles spawned by new_tile
+SPAWN_PROBABILITIES = ((1, 0.9), (2, 0.1))
+
+class SearchTimeout(Exception):
+    """
+    Raised inside the search when the time budget of the
+    current move runs out.
+    """
+    pass
+
+def build_heuristic_table():
+    """
+    Precomputes the static evaluation of every packed row,
+    rewarding empty tiles, possible merges and rows that are
+    monotonic towards either end.
+    """
+    row_heuristic = [0.0] * (1 << ROW_BITS)
+    for row in range(1 << ROW_BITS):
+        exponents = [(row >> (step * TILE_BITS)) & TILE_MASK
+                     for step in range(BITBOARD_SIZE)]
+        
+        num_empty = exponents.count(0)
+        num_merges = 0
+        previous = 0
+        for exponent in exponents:
+            if exponent != 0:
+                if exponent == previous:
+                    num_merges += 1
+                previous = exponent
+        
+        monotonic_left = 0.0
+        monotonic_right = 0.0
+        for step in range(1, BITBOARD_SIZE):
+            weight_before = exponents[step - 1] ** HEUR_MONOTONIC_POWER
+            weight_after = exponents[step] ** HEUR_MONOTONIC_POWER
+            if exponents[step - 1] > exponents[step]:
+                monotonic_left += weight_before - weight_after
+            else:
+                monotonic_right += weight_after - weight_before
+        
+        row_heuristic[row] = (HEUR_BASE + HEUR_EMPTY * num_empty +
+                              HEUR_MERGES * num_merges -
+                              HEUR_MONOTONIC * min(monotonic_left, monotonic_right))
+    ROW_HEURISTIC[:] = row_heuristic
+
+def evaluate_board(board):
+    """
+    Returns the static evaluation of a 4x4 bitboard as the
+    sum of the row heuristic over its rows and columns.
+    """
+    transposed = transpose_board(board)
+    total = 0.0
+    for dummy_row in range(BITBOARD_SIZE):
+        total += ROW_HEURISTIC[board & ROW_MASK] + ROW_HEURISTIC[transposed & ROW_MASK]
+        board >>= ROW_BITS
+        transposed >>= ROW_BITS
+    return total
+
+def game_to_board(game):
+    """
+    Packs the tiles of a 4x4 game into a bitboard.
+    """
+    board = 0
+    for row in range(BITBOARD_SIZE):
+        for col in range(BITBOARD_SIZE):
+            board |= (TILE_EXPONENTS[game.get_tile(row, col)] <<
+                      (TILE_BITS * (BITBOARD_SIZE * row + col)))
+    return board
+
+class ExpectimaxPlayer:
+    """
+    Plays 4x4 games of 2048 with an expectimax search over the
+    player moves and the tiles spawned by new_tile.
+    """
+    
+    def __init__(self, depth=2, time_budget=0.1):
+        """
+        Creates a player that searches up to depth moves ahead
+        and spends at most time_budget seconds per move, or has
+        no time limit if time_budget is None.
+        """
+        self._depth = depth
+        self._time_budget = time_budget
+        self._deadline = None
+        
+        # Transposition table of chance node values keyed on
+        # the board and the remaining depth
+        self._table = {}
+        
+        if not ROW_LEFT:
+            build_row_tables()
+        if not ROW_HEURISTIC:
+            build_heuristic_table()
+    
+    def __call__(self, game, dummy_rng):
+        """
+        Allows the player to be used as a policy of the
+        headless runner.
+        """
+        return self.get_move(game)
+    
+    def get_move(self, game):
+        """
+        Returns the direction to move in from UP, DOWN, LEFT and
+        RIGHT, or None if no move changes the board. Searches
+        one move deeper at a time and keeps the choice of the
+        deepest search that finished within the time budget.
+        """
+        board = game_to_board(game)
+        if self._time_budget is None:
+            self._deadline = None
+        else:
+            self._deadline = time.time() + self._time_budget
+        self._table = {}
+        
+        best_direction = None
+        for depth in range(1, self._depth + 1):
+            try:
+                direction = self._search_root(board, depth)
+            except SearchTimeout:
+                break
+            if direction is None:
+                break
+            best_direction = direction
+        
+        # Always answer with a legal move even if the first
+        # search ran out of time
+        if best_direction is None:
+            for direction in (UP, DOWN, LEFT, RIGHT):
+                if move_board(board, direction)[0] != board:
+                    return direction
+        return best_direction
+    
+    def _search_root(self, board, depth):
+        """
+        Returns the direction with the highest expected value.
+        """
+        best_value = float('-inf')
+        best_direction = None
+        for direction in (UP, DOWN, LEFT, RIGHT):
+            new_board = move_board(board, direction)[0]
+            if new_board != board:
+                value = self._search_chance(new_board, depth)
+                if value > best_value:
+                    best_value = value
+                    best_direction = direction
+        return best_direction
+    
+    def _search_move(self, board, depth):
+        """
+        Returns the value of the best move on the board, or
+        zero if the game is over.
+        """
+        best_value = 0.0
+        for direction in (UP, DOWN, LEFT, RIGHT):
+            new_board = move_board(board, direction)[0]
+            if new_board != board:
+                best_value = max(best_value, self._search_chance(new_board, depth))
+        return best_value
+    
+    def _search_chance(self, board, depth):
+        """
+        Returns the expected value of the board over every tile
+        new_tile could spawn on it.
+        """
+        if depth <= 1:
+            return evaluate_board(board)
+        
+        key = (board, depth)
+        if key in self._table:
+            return self._table[key]
+        if self._deadline is not None and time.time() > self._deadline:
+            raise SearchTimeout()
+        
+        total = 0.0
+        num_empty = 0
+        for shift in range(0, TILE_BITS * BITBOARD_SIZE * BITBOARD_SIZE, TILE_BITS):
+            if (board >> shift) & TILE_MASK == 0:
+                num_empty += 1
+                for exponent, probability in SPAWN_PROBABILITIES:
+                    total += probability * self._search_move(board | (exponent << shift),
+                                                             depth - 1)
+        value = total / num_empty
+        
+        self._table[key] = value
+        return value
+
 # Testing for merge module
 
 print merge([2, 4, 2, 2])
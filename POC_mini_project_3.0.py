@@ -3,21 +3,334 @@ Monte Carlo Tic-Tac-Toe Player
 """
 
 import random
+import math
+import time
 import poc_ttt_gui
 import poc_ttt_provided as provided
 
+# NumPy is only needed for the batched trials
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# The process pool is only needed for the parallel trials
+try:
+    import multiprocessing
+except ImportError:
+    multiprocessing = None
+
 # Constants for Monte Carlo simulator
 # You may change the values of these constants as desired, but
 #  do not change their names.
 NTRIALS = 200       # Number of trials to run
 SCORE_CURRENT = 1.0 # Score for squares played by the current player
 SCORE_OTHER = 2.0   # Score for squares played by the other player
+BATCH_SIZE = 10000  # Number of trials played at once by the batched engine
+TRIAL_INCREMENT = 20 # Number of trials between early stopping checks
+SEPARATION_Z = 3.0  # Standard errors between the best and runner-up squares to stop
+EXPLORATION = math.sqrt(2.0) # Exploration constant of the UCT player
+
+# Indices of the squares of every row, column and diagonal of
+# a flattened board, computed once per dimension
+LINE_INDICES = {}
+
+# Lines through every square of a flattened board, computed
+# once per dimension
+SQUARE_LINES = {}
+
+# Bitmasks of the lines through every square of a board,
+# computed once per dimension
+WIN_MASKS = {}
+
+# Characters used to print the squares of a board
+STRMAP = {provided.EMPTY: " ",
+          provided.PLAYERX: "X",
+          provided.PLAYERO: "O"}
     
 # Add your functions here.
-def mc_trial(board, player):
+def get_square_lines(dim):
+    """
+    Returns a list with, for every flattened square of a board
+    of the given dimension, the list of lines through it.
+    Lines 0 to dim - 1 are the rows, dim to 2 * dim - 1 the
+    columns and the last two the diagonals.
+    """
+    if dim not in SQUARE_LINES:
+        square_lines = []
+        for row in range(dim):
+            for col in range(dim):
+                lines = [row, dim + col]
+                if row == col:
+                    lines.append(2 * dim)
+                if row + col == dim - 1:
+                    lines.append(2 * dim + 1)
+                square_lines.append(lines)
+        SQUARE_LINES[dim] = square_lines
+    return SQUARE_LINES[dim]
+
+def is_reversed(board):
+    """
+    Returns whether a board is a reversed game, as kept in the
+    _reverse attribute of provided.TTTBoard and of the boards
+    below.
+    """
+    return getattr(board, '_reverse', False)
+
+class RolloutBoard:
+    """
+    Class for a tic-tac-toe board with the same methods as
+    provided.TTTBoard that counts the stones of each player on
+    every line as moves are made, so check_win is answered
+    without scanning the board.
+    """
+    
+    def __init__(self, dim, reverse=False, board=None):
+        """
+        Creates a board of the given dimension, either empty or
+        with the squares of a list of lists.
+        """
+        self._dim = dim
+        self._reverse = reverse
+        self._squares = [provided.EMPTY] * (dim * dim)
+        self._square_lines = get_square_lines(dim)
+        self._line_counts = {provided.PLAYERX: [0] * (2 * dim + 2),
+                             provided.PLAYERO: [0] * (2 * dim + 2)}
+        self._num_empty = dim * dim
+        self._winner = None
+        if board != None:
+            for row in range(dim):
+                for col in range(dim):
+                    if board[row][col] != provided.EMPTY:
+                        self.move(row, col, board[row][col])
+    
+    @classmethod
+    def from_board(cls, board, reverse=None):
+        """
+        Creates a rollout board with the squares of another
+        board, reversed like it unless reverse is given.
+        """
+        if reverse == None:
+            reverse = is_reversed(board)
+        dim = board.get_dim()
+        return cls(dim, reverse, [[board.square(row, col) for col in range(dim)]
+                                  for row in range(dim)])
+    
+    def __str__(self):
+        """
+        Returns a string of the board with one row per line.
+        """
+        rep = ""
+        for row in range(self._dim):
+            rep += " | ".join([STRMAP[self.square(row, col)] for col in range(self._dim)])
+            rep += "\n"
+            if row != self._dim - 1:
+                rep += "-" * (4 * self._dim - 3) + "\n"
+        return rep
+    
+    def get_dim(self):
+        """
+        Returns the dimension of the board.
+        """
+        return self._dim
+    
+    def square(self, row, col):
+        """
+        Returns the player on a square or EMPTY.
+        """
+        return self._squares[row * self._dim + col]
+    
+    def get_empty_squares(self):
+        """
+        Returns a list of the (row, col) of the empty squares.
+        """
+        return [divmod(idx, self._dim) for idx, square in enumerate(self._squares)
+                if square == provided.EMPTY]
+    
+    def move(self, row, col, player):
+        """
+        Places player on an empty square and updates the line
+        counts, recording the winner if the move completes a
+        line.
+        """
+        idx = row * self._dim + col
+        if self._squares[idx] != provided.EMPTY:
+            return
+        self._squares[idx] = player
+        self._num_empty -= 1
+        line_counts = self._line_counts[player]
+        for line in self._square_lines[idx]:
+            line_counts[line] += 1
+            if line_counts[line] == self._dim and self._winner == None:
+                if self._reverse:
+                    self._winner = provided.switch_player(player)
+                else:
+                    self._winner = player
+    
+    def check_win(self):
+        """
+        Returns the winner, DRAW if the board is full without a
+        winner or None if the game is not over.
+        """
+        if self._winner != None:
+            return self._winner
+        if self._num_empty == 0:
+            return provided.DRAW
+        return None
+    
+    def clone(self):
+        """
+        Returns a copy of the board.
+        """
+        board_clone = RolloutBoard(self._dim, self._reverse)
+        board_clone._squares = list(self._squares)
+        board_clone._line_counts = {provided.PLAYERX: list(self._line_counts[provided.PLAYERX]),
+                                    provided.PLAYERO: list(self._line_counts[provided.PLAYERO])}
+        board_clone._num_empty = self._num_empty
+        board_clone._winner = self._winner
+        return board_clone
+
+def get_win_masks(dim):
+    """
+    Returns a list with, for every square of a board of the
+    given dimension, the bitmasks of the lines through it. The
+    square (row, col) is bit row * dim + col.
+    """
+    if dim not in WIN_MASKS:
+        line_masks = []
+        for idx in range(dim):
+            line_masks.append(sum([1 << (idx * dim + col) for col in range(dim)]))
+            line_masks.append(sum([1 << (row * dim + idx) for row in range(dim)]))
+        line_masks.append(sum([1 << (idx * dim + idx) for idx in range(dim)]))
+        line_masks.append(sum([1 << (idx * dim + dim - idx - 1) for idx in range(dim)]))
+        WIN_MASKS[dim] = [[mask for mask in line_masks if mask >> square & 1]
+                          for square in range(dim * dim)]
+    return WIN_MASKS[dim]
+
+class TTTBitBoard:
+    """
+    Class for a tic-tac-toe board with the same methods as
+    provided.TTTBoard that stores the stones of each player as
+    the bits of an integer, so a clone copies two integers.
+    """
+    
+    def __init__(self, dim, reverse=False, board=None):
+        """
+        Creates a board of the given dimension, either empty or
+        with the squares of a list of lists.
+        """
+        self._dim = dim
+        self._reverse = reverse
+        self._win_masks = get_win_masks(dim)
+        self._full_mask = (1 << (dim * dim)) - 1
+        self._stones = {provided.PLAYERX: 0, provided.PLAYERO: 0}
+        self._winner = None
+        if board != None:
+            for row in range(dim):
+                for col in range(dim):
+                    if board[row][col] != provided.EMPTY:
+                        self.move(row, col, board[row][col])
+    
+    @classmethod
+    def from_board(cls, board, reverse=None):
+        """
+        Creates a bitboard with the squares of another board,
+        reversed like it unless reverse is given.
+        """
+        if reverse == None:
+            reverse = is_reversed(board)
+        dim = board.get_dim()
+        return cls(dim, reverse, [[board.square(row, col) for col in range(dim)]
+                                  for row in range(dim)])
+    
+    def __str__(self):
+        """
+        Returns a string of the board with one row per line.
+        """
+        rep = ""
+        for row in range(self._dim):
+            rep += " | ".join([STRMAP[self.square(row, col)] for col in range(self._dim)])
+            rep += "\n"
+            if row != self._dim - 1:
+                rep += "-" * (4 * self._dim - 3) + "\n"
+        return rep
+    
+    def get_dim(self):
+        """
+        Returns the dimension of the board.
+        """
+        return self._dim
+    
+    def square(self, row, col):
+        """
+        Returns the player on a square or EMPTY.
+        """
+        bit = 1 << (row * self._dim + col)
+        if self._stones[provided.PLAYERX] & bit:
+            return provided.PLAYERX
+        if self._stones[provided.PLAYERO] & bit:
+            return provided.PLAYERO
+        return provided.EMPTY
+    
+    def get_empty_squares(self):
+        """
+        Returns a list of the (row, col) of the empty squares.
+        """
+        empty_bits = self._full_mask & ~(self._stones[provided.PLAYERX] |
+                                         self._stones[provided.PLAYERO])
+        empty_squares = []
+        while empty_bits:
+            lowest_bit = empty_bits & -empty_bits
+            empty_squares.append(divmod(lowest_bit.bit_length() - 1, self._dim))
+            empty_bits ^= lowest_bit
+        return empty_squares
+    
+    def move(self, row, col, player):
+        """
+        Places player on an empty square, recording the winner
+        if the move completes a line through it.
+        """
+        square = row * self._dim + col
+        bit = 1 << square
+        if (self._stones[provided.PLAYERX] | self._stones[provided.PLAYERO]) & bit:
+            return
+        stones = self._stones[player] | bit
+        self._stones[player] = stones
+        if self._winner == None:
+            for mask in self._win_masks[square]:
+                if stones & mask == mask:
+                    if self._reverse:
+                        self._winner = provided.switch_player(player)
+                    else:
+                        self._winner = player
+                    break
+    
+    def check_win(self):
+        """
+        Returns the winner, DRAW if the board is full without a
+        winner or None if the game is not over.
+        """
+        if self._winner != None:
+            return self._winner
+        if self._stones[provided.PLAYERX] | self._stones[provided.PLAYERO] == self._full_mask:
+            return provided.DRAW
+        return None
+    
+    def clone(self):
+        """
+        Returns a copy of the board.
+        """
+        board_clone = TTTBitBoard(self._dim, self._reverse)
+        board_clone._stones = {provided.PLAYERX: self._stones[provided.PLAYERX],
+                               provided.PLAYERO: self._stones[provided.PLAYERO]}
+        board_clone._winner = self._winner
+        return board_clone
+
+def mc_trial(board, player, rng=random):
     """
     This functions should take the current board and make
-    moves by two players
+    moves by two players, picking the squares with the given
+    random number generator
     """
     
     # Proceed with the game there is at least an empty square or
@@ -28,7 +341,7 @@ def mc_trial(board, player):
         empty_square_list = board.get_empty_squares()
     
         # Randomly picked one of the coordinates of the list
-        get_random_square = random.randrange(len(empty_square_list))
+        get_random_square = rng.randrange(len(empty_square_list))
         get_row_col = empty_square_list[get_random_square]
         rand_row = get_row_col[0]
         rand_col = get_row_col[1]
@@ -92,20 +405,403 @@ def get_best_move(board, scores):
 
     return max_row_col
 
-def mc_move(board, player, trials):
+def board_symmetries(board):
     """
-    This function combines the previous functions
+    This function returns the rotations and reflections of the
+    square that leave the board unchanged, each as a list of
+    the (row, col) every square is mapped to, row by row.
+    """
+    dim = board.get_dim()
+    last = dim - 1
+    transforms = [lambda row, col: (row, col),
+                  lambda row, col: (col, last - row),
+                  lambda row, col: (last - row, last - col),
+                  lambda row, col: (last - col, row),
+                  lambda row, col: (row, last - col),
+                  lambda row, col: (last - row, col),
+                  lambda row, col: (col, row),
+                  lambda row, col: (last - col, last - row)]
+    
+    symmetries = []
+    for transform in transforms:
+        mapping = [transform(row, col) for row in range(dim) for col in range(dim)]
+        symmetric = True
+        for idx, (row, col) in enumerate(mapping):
+            if board.square(row, col) != board.square(idx // dim, idx % dim):
+                symmetric = False
+                break
+        if symmetric:
+            symmetries.append(mapping)
+    return symmetries
+
+def mc_move(board, player, trials, use_symmetry=False):
+    """
+    This function combines the previous functions. With
+    use_symmetry the score of every trial is also added to
+    the squares it is mapped to by the symmetries of the
+    board.
     """
     
     # Create a clone of the board
-    scores = [[0] * board.get_dim() for dummy_idx in range(board.get_dim())]
+    dim = board.get_dim()
+    scores = [[0] * dim for dummy_idx in range(dim)]
+    if use_symmetry:
+        symmetries = board_symmetries(board)
     for dummy_trial in range(trials):
         board_clone = board.clone()
         mc_trial(board_clone, player)
+        if use_symmetry and len(symmetries) > 1:
+            trial_scores = [[0] * dim for dummy_idx in range(dim)]
+            mc_update_scores(trial_scores, board_clone, player)
+            for mapping in symmetries:
+                for idx, (row, col) in enumerate(mapping):
+                    scores[row][col] += trial_scores[idx // dim][idx % dim]
+        else:
+            mc_update_scores(scores, board_clone, player)
+    
+    return get_best_move(board, scores)
+
+def get_line_indices(dim):
+    """
+    Returns an array with one row per winning line of a board
+    of the given dimension, holding the flattened indices of
+    the squares of that line.
+    """
+    if dim not in LINE_INDICES:
+        lines = []
+        for idx in range(dim):
+            lines.append([idx * dim + col for col in range(dim)])
+            lines.append([row * dim + idx for row in range(dim)])
+        lines.append([idx * dim + idx for idx in range(dim)])
+        lines.append([idx * dim + dim - idx - 1 for idx in range(dim)])
+        LINE_INDICES[dim] = np.array(lines)
+    return LINE_INDICES[dim]
+
+def mc_batch_scores(board, player, trials, rng=None):
+    """
+    This function plays all the trials at once as arrays and
+    returns the summed scores of the squares, the same grid
+    mc_update_scores builds over trials calls to mc_trial.
+    """
+    if np is None:
+        raise ImportError("the batched trials require NumPy")
+    if rng is None:
+        rng = np.random
+    
+    dim = board.get_dim()
+    other_player = provided.switch_player(player)
+    cells = np.array([board.square(row, col) for row in range(dim)
+                      for col in range(dim)])
+    empty_cells = np.flatnonzero(cells == provided.EMPTY)
+    num_empty = len(empty_cells)
+    lines = get_line_indices(dim)
+    
+    # The players alternate starting with the current player
+    move_players = np.where(np.arange(num_empty) % 2 == 0, player, other_player)
+    
+    scores = np.zeros(dim * dim)
+    for batch_start in range(0, trials, BATCH_SIZE):
+        num_trials = min(BATCH_SIZE, trials - batch_start)
+        trial_idx = np.arange(num_trials)[:, np.newaxis]
+        
+        # Plays every empty square in a random order, keeping
+        # the move number each square was played at
+        move_squares = empty_cells[np.argsort(rng.random_sample((num_trials, num_empty)), axis=1)]
+        owners = np.tile(cells, (num_trials, 1))
+        owners[trial_idx, move_squares] = move_players
+        move_times = np.full((num_trials, dim * dim), -1)
+        move_times[trial_idx, move_squares] = np.arange(num_empty)
+        
+        # A line is won at the move that filled its last square
+        # if all its squares belong to the same player, and the
+        # game ends at the first line won
+        line_owners = owners[:, lines]
+        line_won = (np.all(line_owners == player, axis=2) |
+                    np.all(line_owners == other_player, axis=2))
+        win_times = np.where(line_won, move_times[:, lines].max(axis=2), num_empty)
+        first_line = win_times.argmin(axis=1)
+        end_times = win_times[np.arange(num_trials), first_line]
+        line_winners = line_owners[np.arange(num_trials), first_line, 0]
+        
+        # The owner of the line loses a reversed game
+        if is_reversed(board):
+            line_winners = np.where(line_winners == player, other_player, player)
+        winners = np.where(end_times < num_empty, line_winners, provided.DRAW)
+        
+        # Only the squares played before the game ended score,
+        # with the sign of the result for the current player
+        played = move_times <= end_times[:, np.newaxis]
+        square_scores = (SCORE_CURRENT * ((owners == player) & played) -
+                         SCORE_OTHER * ((owners == other_player) & played))
+        result_signs = ((winners == player).astype(float) -
+                        (winners == other_player).astype(float))
+        scores += result_signs.dot(square_scores)
+    
+    return scores.reshape(dim, dim).tolist()
+
+def mc_move_batched(board, player, trials):
+    """
+    This function does the same as mc_move with all the trials
+    played at once.
+    """
+    return get_best_move(board, mc_batch_scores(board, player, trials))
+
+def mc_shard_scores(shard_args):
+    """
+    This function runs one shard of the trials in a worker.
+    Takes a tuple of the board, the player, the number of
+    trials and the seed of the shard and returns its scores.
+    """
+    board, player, trials, seed = shard_args
+    rng = random.Random(seed)
+    scores = [[0] * board.get_dim() for dummy_idx in range(board.get_dim())]
+    for dummy_trial in range(trials):
+        board_clone = board.clone()
+        mc_trial(board_clone, player, rng)
         mc_update_scores(scores, board_clone, player)
+    return scores
+
+def mc_move_parallel(board, player, trials, processes=None, seed=0):
+    """
+    This function does the same as mc_move with the trials
+    split into one shard per worker process, shard i seeded
+    with seed + i. The move only depends on the seed and the
+    number of processes.
+    """
+    if processes is None:
+        if multiprocessing is None:
+            processes = 1
+        else:
+            processes = multiprocessing.cpu_count()
+    
+    shard_args = []
+    for shard in range(processes):
+        shard_trials = trials // processes + (shard < trials % processes)
+        shard_args.append((board, player, shard_trials, seed + shard))
+    
+    if processes == 1 or multiprocessing is None:
+        shard_scores = [mc_shard_scores(args) for args in shard_args]
+    else:
+        pool = multiprocessing.Pool(processes)
+        try:
+            shard_scores = pool.map(mc_shard_scores, shard_args)
+        finally:
+            pool.close()
+            pool.join()
+    
+    # Sums the partial score grids of the shards
+    dim = board.get_dim()
+    scores = [[0] * dim for dummy_idx in range(dim)]
+    for partial_scores in shard_scores:
+        for row in range(dim):
+            for col in range(dim):
+                scores[row][col] += partial_scores[row][col]
     
     return get_best_move(board, scores)
 
+def mc_move_timed(board, player, budget_ms):
+    """
+    This function runs trials in increments for at most
+    budget_ms milliseconds, stopping early once the best empty
+    square scores SEPARATION_Z standard errors above the
+    runner-up. Returns a tuple of the move and the number of
+    trials used.
+    """
+    deadline = time.time() + budget_ms / 1000.0
+    dim = board.get_dim()
+    empty_square_list = board.get_empty_squares()
+    scores = [[0] * dim for dummy_idx in range(dim)]
+    squared_scores = [[0] * dim for dummy_idx in range(dim)]
+    trials = 0
+    
+    while True:
+        for dummy_trial in range(TRIAL_INCREMENT):
+            board_clone = board.clone()
+            mc_trial(board_clone, player)
+            
+            # Keeps the sums of the scores and of their squares
+            # to estimate the variance of every square
+            trial_scores = [[0] * dim for dummy_idx in range(dim)]
+            mc_update_scores(trial_scores, board_clone, player)
+            for row, col in empty_square_list:
+                scores[row][col] += trial_scores[row][col]
+                squared_scores[row][col] += trial_scores[row][col] ** 2
+        trials += TRIAL_INCREMENT
+        
+        if time.time() >= deadline or len(empty_square_list) == 1:
+            break
+        
+        # Compares the best square with the runner-up
+        ranked_squares = sorted(empty_square_list,
+                                key=lambda square: scores[square[0]][square[1]],
+                                reverse=True)
+        separation = 0.0
+        for row, col in ranked_squares[:2]:
+            mean = float(scores[row][col]) / trials
+            separation += (float(squared_scores[row][col]) / trials - mean ** 2) / trials
+        best_row, best_col = ranked_squares[0]
+        second_row, second_col = ranked_squares[1]
+        difference = float(scores[best_row][best_col] - scores[second_row][second_col]) / trials
+        if difference > SEPARATION_Z * math.sqrt(max(separation, 0.0)):
+            break
+    
+    return get_best_move(board, scores), trials
+
+def board_key(board):
+    """
+    This function returns a tuple of all the squares of the
+    board, used to recognize a board position.
+    """
+    dim = board.get_dim()
+    return tuple(board.square(row, col) for row in range(dim) for col in range(dim))
+
+class MCTSNode:
+    """
+    Class for a position in the UCT search tree.
+    """
+    
+    def __init__(self, board, player, move=None):
+        """
+        Creates the node of a board where player is to move,
+        reached by the given move.
+        """
+        self.key = board_key(board)
+        self.player = player
+        self.move = move
+        self.children = []
+        if board.check_win() == None:
+            self.untried_moves = board.get_empty_squares()
+        else:
+            self.untried_moves = []
+        random.shuffle(self.untried_moves)
+        self.visits = 0
+        
+        # Wins counted for the player who made the move into
+        # this node, draws count as half a win
+        self.wins = 0.0
+    
+    def select_child(self, exploration):
+        """
+        Returns the child with the highest upper confidence
+        bound.
+        """
+        log_visits = math.log(self.visits)
+        best_child = None
+        best_bound = float('-inf')
+        for child in self.children:
+            bound = (child.wins / child.visits +
+                     exploration * math.sqrt(log_visits / child.visits))
+            if bound > best_bound:
+                best_bound = bound
+                best_child = child
+        return best_child
+
+class MCTSPlayer:
+    """
+    Class for a UCT Monte Carlo tree search player. An instance
+    can be passed wherever mc_move is, using the trials as the
+    number of search iterations. The subtree of the move played
+    is kept for the next move.
+    """
+    
+    def __init__(self, exploration=EXPLORATION):
+        """
+        Creates a player with the given exploration constant.
+        """
+        self._exploration = exploration
+        self._root = None
+    
+    def __call__(self, board, player, trials):
+        """
+        Returns the move to play after trials iterations.
+        """
+        return self.get_move(board, player, trials)
+    
+    def _find_root(self, board, player):
+        """
+        Returns the node of the kept tree that matches the board,
+        looking at the kept root and the positions after one
+        more move, or a new node if there is none.
+        """
+        key = board_key(board)
+        if self._root is not None:
+            if self._root.key == key and self._root.player == player:
+                return self._root
+            for child in self._root.children:
+                if child.key == key and child.player == player:
+                    return child
+        return MCTSNode(board, player)
+    
+    def get_move(self, board, player, trials):
+        """
+        Runs trials iterations of selection, expansion, random
+        playout and backpropagation from the board and returns
+        the most visited move, or a random legal move if no move
+        was expanded.
+        """
+        root = self._find_root(board, player)
+        
+        for dummy_trial in range(trials):
+            node = root
+            board_clone = board.clone()
+            path = [node]
+            
+            # Selection of fully expanded nodes
+            while not node.untried_moves and node.children:
+                node = node.select_child(self._exploration)
+                board_clone.move(node.move[0], node.move[1],
+                                 provided.switch_player(node.player))
+                path.append(node)
+            
+            # Expansion of one untried move
+            if node.untried_moves:
+                move = node.untried_moves.pop()
+                board_clone.move(move[0], move[1], node.player)
+                child = MCTSNode(board_clone, provided.switch_player(node.player), move)
+                node.children.append(child)
+                node = child
+                path.append(node)
+            
+            # Random playout and backpropagation
+            mc_trial(board_clone, node.player)
+            winner = board_clone.check_win()
+            for path_node in path:
+                path_node.visits += 1
+                if winner == provided.DRAW:
+                    path_node.wins += 0.5
+                elif winner != path_node.player:
+                    path_node.wins += 1.0
+        
+        if root.children:
+            best_child = max(root.children, key=lambda child: child.visits)
+        else:
+            
+            # Without any iteration there is no visited move,
+            # so an untried one is played from a new node
+            if root.untried_moves:
+                move = root.untried_moves.pop()
+            else:
+                move = random.choice(board.get_empty_squares())
+            board_clone = board.clone()
+            board_clone.move(move[0], move[1], player)
+            best_child = MCTSNode(board_clone, provided.switch_player(player), move)
+        self._root = best_child
+        return best_child.move
+
+def mc_move_rollout(board, player, trials):
+    """
+    This function does the same as mc_move with the trials
+    played on a RolloutBoard copy of the board.
+    """
+    return mc_move(RolloutBoard.from_board(board), player, trials)
+
+def mc_move_bitboard(board, player, trials):
+    """
+    This function does the same as mc_move with the trials
+    played on a TTTBitBoard copy of the board.
+    """
+    return mc_move(TTTBitBoard.from_board(board), player, trials)
+
 # Test functions
 # Board = provided.TTTBoard(3, False, None)
 
@@ -8,6 +8,73 @@ Lower level might be needed
 import codeskulptor
 codeskulptor.set_timeout(20)
 
+import math
+
+# Packed records are only needed by the table files
+try:
+    import struct
+except ImportError:
+    struct = None
+
+# The memory map is only needed by the game table
+try:
+    import mmap
+except ImportError:
+    mmap = None
+
+# The process pool is only needed to build the game table
+try:
+    import multiprocessing
+except ImportError:
+    multiprocessing = None
+
+# Memoized distinct rolls with their probabilities, keyed on
+# (num_die_sides, num_free_dice)
+ROLL_PROBABILITIES = {}
+
+# Memoized expected values, keyed on (sorted held dice,
+# num_die_sides, num_free_dice)
+EXPECTED_VALUES = {}
+
+# Turn table file: a header with the number of dice, sides and
+# rerolls, then for every number of rolls left from 0 up and
+# every sorted hand in order, the value of the hand and the
+# bitmask of the positions of the sorted hand to hold
+TURN_TABLE_MAGIC = 'YTZT'
+TURN_TABLE_HEADER = '<4sBBB'
+TURN_TABLE_ENTRY = '<dH'
+
+# Strategy table file: a header with the number of dice and
+# sides, then for every sorted hand in order its expected
+# score and the bitmask of the positions of the hand to hold
+STRATEGY_TABLE_MAGIC = 'YTZS'
+STRATEGY_TABLE_HEADER = '<4sBB'
+
+# Upper section bonus of the whole game solver
+UPPER_BONUS_THRESHOLD = 63
+UPPER_BONUS = 35
+
+# Lower section categories of the whole game solver, which come
+# after the upper category of every value, and their fixed scores
+LOWER_CATEGORIES = ('three_of_a_kind', 'four_of_a_kind', 'full_house',
+                    'small_straight', 'large_straight', 'yahtzee', 'chance')
+FULL_HOUSE_SCORE = 25
+SMALL_STRAIGHT_SCORE = 30
+LARGE_STRAIGHT_SCORE = 40
+YAHTZEE_SCORE = 50
+
+# Hands, holds and roll probabilities of a turn, keyed on
+# (num_dice, num_die_sides)
+TURN_STRUCTURES = {}
+
+# Game table file: a header with the number of dice, sides and
+# rerolls, the value of every scorecard state as a double, then
+# the advice of every state: the category to fill for every
+# final hand as one byte and, for every number of rerolls left
+# from 1 up, the hold bitmask of every hand as one byte
+GAME_TABLE_MAGIC = 'YTZG'
+GAME_TABLE_HEADER = '<4sBBB'
+
 def gen_all_sequences(outcomes, length):
     """
     Iterative function that enumerates the set of all sequences of
@@ -26,6 +93,44 @@ def gen_all_sequences(outcomes, length):
     return answer_set
 
 
+def gen_sorted_sequences(outcomes, length):
+    """
+    Iterative function that enumerates the set of all sorted
+    sequences of outcomes of given length, one per multiset.
+    """
+    
+    answer_set = set([()])
+    for dummy_idx in range(length):
+        temp_set = set()
+        for partial_sequence in answer_set:
+            for item in outcomes:
+                if not partial_sequence or item >= partial_sequence[-1]:
+                    temp_set.add(partial_sequence + (item,))
+        answer_set = temp_set
+    return answer_set
+
+
+def roll_probabilities(num_die_sides, num_free_dice):
+    """
+    Returns a list of (roll, probability) for every distinct
+    sorted roll of num_free_dice dice, weighted by the number
+    of ordered sequences that sort to it.
+    """
+    key = (num_die_sides, num_free_dice)
+    if key not in ROLL_PROBABILITIES:
+        num_sequences = float(num_die_sides ** num_free_dice)
+        rolls = []
+        for roll in gen_sorted_sequences(range(1, num_die_sides + 1), num_free_dice):
+            
+            # Multinomial coefficient of the counts of each value
+            num_orders = math.factorial(num_free_dice)
+            for value in set(roll):
+                num_orders //= math.factorial(roll.count(value))
+            rolls.append((roll, num_orders / num_sequences))
+        ROLL_PROBABILITIES[key] = rolls
+    return ROLL_PROBABILITIES[key]
+
+
 def score(hand):
     """
     Compute the maximal score for a Yahtzee hand according to the
@@ -83,6 +188,21 @@ def expected_value(held_dice, num_die_sides, num_free_dice):
     
     return sum_possible_values
 
+def expected_value_multiset(held_dice, num_die_sides, num_free_dice):
+    """
+    Same as expected_value, enumerating only the distinct rolls
+    of the free dice weighted by their probability and
+    remembering every result.
+    """
+    held_dice = tuple(sorted(held_dice))
+    key = (held_dice, num_die_sides, num_free_dice)
+    if key not in EXPECTED_VALUES:
+        value = 0.0
+        for roll, probability in roll_probabilities(num_die_sides, num_free_dice):
+            value += probability * score(tuple(sorted(held_dice + roll)))
+        EXPECTED_VALUES[key] = value
+    return EXPECTED_VALUES[key]
+
 def gen_all_holds(hand):
     """
     Generate all possible choices of dice from hand to hold.
@@ -110,6 +230,44 @@ def gen_all_holds(hand):
     
     return all_holds
 
+def gen_all_holds_bitmask(hand):
+    """
+    Same as gen_all_holds without enumerating index sequences.
+    A sorted hand is split into counts of each value and every
+    sub-count is held once, any other hand walks the bitmasks
+    of its indices and keeps each distinct hold.
+
+    hand: full yahtzee hand
+
+    Returns a set of tuples, where each tuple is dice to hold
+    """
+    hand = tuple(hand)
+    if list(hand) == sorted(hand):
+        
+        # Counts the dice of each value in order
+        values = []
+        counts = []
+        for die in hand:
+            if values and values[-1] == die:
+                counts[-1] += 1
+            else:
+                values.append(die)
+                counts.append(1)
+        
+        all_holds = set([()])
+        for value, count in zip(values, counts):
+            temp_set = set()
+            for partial_hold in all_holds:
+                for num_held in range(count + 1):
+                    temp_set.add(partial_hold + (value,) * num_held)
+            all_holds = temp_set
+        return all_holds
+    
+    all_holds = set()
+    for mask in range(1 << len(hand)):
+        all_holds.add(tuple([hand[idx] for idx in range(len(hand)) if mask >> idx & 1]))
+    return all_holds
+
 def strategy(hand, num_die_sides):
     """
     Compute the hold that maximizes the expected value when the
@@ -121,11 +279,12 @@ def strategy(hand, num_die_sides):
     Returns a tuple where the first element is the expected score and
     the second element is a tuple of the dice to hold
     """
-    all_holds_value = gen_all_holds(hand)
+    all_holds_value = gen_all_holds_bitmask(hand)
     max_expected_val = 0.0
     max_val_hold = tuple()
     for dummy_all_holds in all_holds_value:
-        expect_val = expected_value(dummy_all_holds, num_die_sides, len(hand)-len(dummy_all_holds))
+        expect_val = expected_value_multiset(dummy_all_holds, num_die_sides,
+                                             len(hand)-len(dummy_all_holds))
         if (expect_val >= max_expected_val):
             max_val_hold = tuple(dummy_all_holds)
             max_expected_val = expect_val
@@ -133,6 +292,554 @@ def strategy(hand, num_die_sides):
     return (max_expected_val, max_val_hold)
 
 
+def strategy_table(num_dice, num_die_sides):
+    """
+    Compute the strategy for every distinct sorted hand at once,
+    every hand sharing the memoized expected values.
+
+    Returns a dictionary from each sorted hand to the tuple
+    strategy returns for it
+    """
+    table = {}
+    for hand in sorted(gen_sorted_sequences(range(1, num_die_sides + 1), num_dice)):
+        table[hand] = strategy(hand, num_die_sides)
+    return table
+
+
+def save_strategy_table(table, num_dice, num_die_sides, path):
+    """
+    Writes a table computed by strategy_table to a file at path.
+    """
+    if struct is None:
+        raise ImportError("the table files require struct")
+    table_file = open(path, 'wb')
+    table_file.write(struct.pack(STRATEGY_TABLE_HEADER, STRATEGY_TABLE_MAGIC,
+                                 num_dice, num_die_sides))
+    for hand in sorted(gen_sorted_sequences(range(1, num_die_sides + 1), num_dice)):
+        expected_score, hold = table[hand]
+        table_file.write(struct.pack(TURN_TABLE_ENTRY, expected_score, hold_mask(hand, hold)))
+    table_file.close()
+
+
+def load_strategy_table(path):
+    """
+    Reads a table written by save_strategy_table, so that the
+    strategy for a hand is table[tuple(sorted(hand))].
+    """
+    if struct is None:
+        raise ImportError("the table files require struct")
+    table_file = open(path, 'rb')
+    data = table_file.read()
+    table_file.close()
+    
+    magic, num_dice, num_die_sides = struct.unpack_from(STRATEGY_TABLE_HEADER, data, 0)
+    assert magic == STRATEGY_TABLE_MAGIC, "not a strategy table file"
+    
+    table = {}
+    offset = struct.calcsize(STRATEGY_TABLE_HEADER)
+    for hand in sorted(gen_sorted_sequences(range(1, num_die_sides + 1), num_dice)):
+        expected_score, mask = struct.unpack_from(TURN_TABLE_ENTRY, data, offset)
+        offset += struct.calcsize(TURN_TABLE_ENTRY)
+        table[hand] = (expected_score,
+                       tuple([hand[idx] for idx in range(num_dice) if mask >> idx & 1]))
+    return table
+
+
+def hold_mask(hand, hold):
+    """
+    Returns the bitmask of the positions of a sorted hand that
+    make up a sorted hold, using the first matching dice.
+    """
+    mask = 0
+    hold_idx = 0
+    for idx in range(len(hand)):
+        if hold_idx < len(hold) and hand[idx] == hold[hold_idx]:
+            mask |= 1 << idx
+            hold_idx += 1
+    return mask
+
+
+class TurnTables:
+    """
+    Class for the value and best hold of every sorted hand for
+    every number of rerolls left in a turn.
+    """
+    
+    def __init__(self, num_dice, num_die_sides, num_rolls, values, holds):
+        """
+        Creates the tables from lists indexed by the number of
+        rolls left of dictionaries keyed on sorted hands.
+        """
+        self._num_dice = num_dice
+        self._num_die_sides = num_die_sides
+        self._num_rolls = num_rolls
+        self._values = values
+        self._holds = holds
+    
+    def advice(self, hand, rolls_left=None):
+        """
+        Returns a tuple of the expected score of the turn and the
+        dice to hold for a hand with rolls_left rerolls left, all
+        the rerolls of a turn by default.
+        """
+        if rolls_left is None:
+            rolls_left = self._num_rolls
+        hand = tuple(sorted(hand))
+        return self._values[rolls_left][hand], self._holds[rolls_left][hand]
+    
+    def save(self, path):
+        """
+        Writes the tables to a file at path.
+        """
+        if struct is None:
+            raise ImportError("the table files require struct")
+        hands = sorted(self._values[0])
+        table_file = open(path, 'wb')
+        table_file.write(struct.pack(TURN_TABLE_HEADER, TURN_TABLE_MAGIC, self._num_dice,
+                                     self._num_die_sides, self._num_rolls))
+        for rolls_left in range(self._num_rolls + 1):
+            for hand in hands:
+                table_file.write(struct.pack(
+                    TURN_TABLE_ENTRY, self._values[rolls_left][hand],
+                    hold_mask(hand, self._holds[rolls_left][hand])))
+        table_file.close()
+
+
+def build_turn_tables(num_dice, num_die_sides, num_rolls=2):
+    """
+    Computes the value of every sorted hand scored after up to
+    num_rolls rerolls, from no rerolls left up. The expected
+    value of a hold is shared by every hand it comes from.
+    """
+    hands = sorted(gen_sorted_sequences(range(1, num_die_sides + 1), num_dice))
+    values = [dict((hand, float(score(hand))) for hand in hands)]
+    holds = [dict((hand, hand) for hand in hands)]
+    
+    for rolls_left in range(1, num_rolls + 1):
+        previous_values = values[-1]
+        hold_values = {}
+        new_values = {}
+        new_holds = {}
+        for hand in hands:
+            best_value = None
+            best_hold = None
+            for hold in sorted(gen_all_holds_bitmask(hand)):
+                if hold not in hold_values:
+                    hold_value = 0.0
+                    for roll, probability in roll_probabilities(num_die_sides,
+                                                                num_dice - len(hold)):
+                        hold_value += probability * previous_values[tuple(sorted(hold + roll))]
+                    hold_values[hold] = hold_value
+                if best_value is None or hold_values[hold] > best_value:
+                    best_value = hold_values[hold]
+                    best_hold = hold
+            new_values[hand] = best_value
+            new_holds[hand] = best_hold
+        values.append(new_values)
+        holds.append(new_holds)
+    
+    return TurnTables(num_dice, num_die_sides, num_rolls, values, holds)
+
+
+def load_turn_tables(path):
+    """
+    Reads the tables written by TurnTables.save.
+    """
+    if struct is None:
+        raise ImportError("the table files require struct")
+    table_file = open(path, 'rb')
+    data = table_file.read()
+    table_file.close()
+    
+    magic, num_dice, num_die_sides, num_rolls = struct.unpack_from(TURN_TABLE_HEADER, data, 0)
+    assert magic == TURN_TABLE_MAGIC, "not a turn table file"
+    hands = sorted(gen_sorted_sequences(range(1, num_die_sides + 1), num_dice))
+    
+    offset = struct.calcsize(TURN_TABLE_HEADER)
+    values = []
+    holds = []
+    for dummy_rolls_left in range(num_rolls + 1):
+        rolls_values = {}
+        rolls_holds = {}
+        for hand in hands:
+            value, mask = struct.unpack_from(TURN_TABLE_ENTRY, data, offset)
+            offset += struct.calcsize(TURN_TABLE_ENTRY)
+            rolls_values[hand] = value
+            rolls_holds[hand] = tuple([hand[idx] for idx in range(num_dice) if mask >> idx & 1])
+        values.append(rolls_values)
+        holds.append(rolls_holds)
+    
+    return TurnTables(num_dice, num_die_sides, num_rolls, values, holds)
+
+
+def num_game_categories(num_die_sides):
+    """
+    Returns the number of categories of the whole game solver,
+    the upper category of every value and the lower categories.
+    """
+    return num_die_sides + len(LOWER_CATEGORIES)
+
+
+def category_score(counts, category):
+    """
+    Returns the score of a hand in a category of the whole game
+    solver given the number of dice of every value in the hand.
+    Category value - 1 is the upper category of value, the
+    categories after the upper ones are LOWER_CATEGORIES in order.
+    """
+    num_die_sides = len(counts)
+    if category < num_die_sides:
+        return counts[category] * (category + 1)
+    
+    total = sum([count * (value + 1) for value, count in enumerate(counts)])
+    most_of_a_kind = max(counts)
+    
+    # Longest run of consecutive values in the hand
+    longest_run = 0
+    run = 0
+    for count in counts:
+        if count > 0:
+            run += 1
+            longest_run = max(longest_run, run)
+        else:
+            run = 0
+    
+    name = LOWER_CATEGORIES[category - num_die_sides]
+    if name == 'three_of_a_kind' and most_of_a_kind >= 3:
+        return total
+    elif name == 'four_of_a_kind' and most_of_a_kind >= 4:
+        return total
+    elif name == 'full_house' and sorted(counts)[-2:] == [2, 3]:
+        return FULL_HOUSE_SCORE
+    elif name == 'small_straight' and longest_run >= 4:
+        return SMALL_STRAIGHT_SCORE
+    elif name == 'large_straight' and longest_run >= 5:
+        return LARGE_STRAIGHT_SCORE
+    elif name == 'yahtzee' and most_of_a_kind == sum(counts):
+        return YAHTZEE_SCORE
+    elif name == 'chance':
+        return total
+    return 0
+
+
+def gen_turn_structure(num_dice, num_die_sides):
+    """
+    Returns the hands, holds, roll probabilities and category
+    scores shared by every turn of the game solver, computed
+    once per number of dice and sides. Holds are ordered from
+    the most dice held down, and the holds of num_dice dice are
+    the hands in order.
+    """
+    key = (num_dice, num_die_sides)
+    if key not in TURN_STRUCTURES:
+        outcomes = range(1, num_die_sides + 1)
+        hands = sorted(gen_sorted_sequences(outcomes, num_dice))
+        holds = []
+        for num_held in range(num_dice, -1, -1):
+            holds.extend(sorted(gen_sorted_sequences(outcomes, num_held)))
+        hold_index = dict((hold, idx) for idx, hold in enumerate(holds))
+        
+        # Holding fewer dice is rolling one more die at a time
+        hold_children = []
+        for hold in holds:
+            if len(hold) == num_dice:
+                hold_children.append(None)
+            else:
+                hold_children.append([hold_index[tuple(sorted(hold + (value,)))]
+                                      for value in outcomes])
+        
+        hand_holds = []
+        for hand in hands:
+            hand_holds.append([(hold_index[hold], hold_mask(hand, hold))
+                               for hold in sorted(gen_all_holds_bitmask(hand))])
+        
+        probabilities = dict(roll_probabilities(num_die_sides, num_dice))
+        hand_counts = [[hand.count(value) for value in outcomes] for hand in hands]
+        TURN_STRUCTURES[key] = {
+            'hands': hands,
+            'hand_index': dict((hand, idx) for idx, hand in enumerate(hands)),
+            'hand_scores': [[category_score(counts, category)
+                             for category in range(num_game_categories(num_die_sides))]
+                            for counts in hand_counts],
+            'hand_probabilities': [probabilities[hand] for hand in hands],
+            'holds': holds,
+            'hold_children': hold_children,
+            'hand_holds': hand_holds}
+    return TURN_STRUCTURES[key]
+
+
+def game_state_index(used_mask, upper_total):
+    """
+    Returns the index of a scorecard state, the upper total
+    being capped at UPPER_BONUS_THRESHOLD.
+    """
+    return used_mask * (UPPER_BONUS_THRESHOLD + 1) + min(upper_total, UPPER_BONUS_THRESHOLD)
+
+
+def reachable_upper_totals(used_mask, num_dice, num_die_sides):
+    """
+    Returns the sorted list of the capped upper totals that can
+    be reached when the categories of used_mask are filled. Only
+    the upper categories count.
+    """
+    totals = set([0])
+    for value in range(1, num_die_sides + 1):
+        if used_mask >> (value - 1) & 1:
+            totals = set([min(total + count * value, UPPER_BONUS_THRESHOLD)
+                          for total in totals for count in range(num_dice + 1)])
+    return sorted(totals)
+
+
+def solve_game_turn(used_mask, upper_total, next_values, num_dice, num_die_sides, num_rolls):
+    """
+    Solves one turn of the game from a scorecard state given the
+    values of the states after it, a dictionary keyed on the
+    category filled of the lists of values by upper total. Only
+    the upper categories add to the upper total and the bonus.
+    
+    Returns the value of the state, the category to fill for
+    every final hand and the hold masks for every hand for every
+    number of rerolls left from 1 up.
+    """
+    structure = gen_turn_structure(num_dice, num_die_sides)
+    hands = structure['hands']
+    holds = structure['holds']
+    hold_children = structure['hold_children']
+    
+    # Fills the best category for every final hand
+    hand_values = []
+    hand_categories = []
+    for hand_scores in structure['hand_scores']:
+        best_value = None
+        best_category = 0
+        for category, category_values in next_values.items():
+            hand_score = hand_scores[category]
+            if category < num_die_sides:
+                new_total = min(upper_total + hand_score, UPPER_BONUS_THRESHOLD)
+                value = hand_score + category_values[new_total]
+                if upper_total < UPPER_BONUS_THRESHOLD <= upper_total + hand_score:
+                    value += UPPER_BONUS
+            else:
+                value = hand_score + category_values[upper_total]
+            if best_value is None or value > best_value:
+                best_value = value
+                best_category = category
+        hand_values.append(best_value)
+        hand_categories.append(best_category)
+    
+    # Every reroll averages the holds one die at a time and
+    # keeps the best hold of every hand
+    hand_hold_masks = []
+    for dummy_rolls_left in range(num_rolls):
+        hold_values = [0.0] * len(holds)
+        for idx in range(len(holds)):
+            if hold_children[idx] is None:
+                hold_values[idx] = hand_values[idx]
+            else:
+                hold_values[idx] = sum([hold_values[child]
+                                        for child in hold_children[idx]]) / num_die_sides
+        
+        new_hand_values = []
+        hold_masks = []
+        for hand_holds in structure['hand_holds']:
+            best_value = None
+            best_mask = 0
+            for hold_idx, mask in hand_holds:
+                if best_value is None or hold_values[hold_idx] > best_value:
+                    best_value = hold_values[hold_idx]
+                    best_mask = mask
+            new_hand_values.append(best_value)
+            hold_masks.append(best_mask)
+        hand_values = new_hand_values
+        hand_hold_masks.append(hold_masks)
+    
+    state_value = 0.0
+    for idx in range(len(hands)):
+        state_value += structure['hand_probabilities'][idx] * hand_values[idx]
+    return state_value, hand_categories, hand_hold_masks
+
+
+def solve_game_states(solve_args):
+    """
+    Solves a list of scorecard states of one level in a worker.
+    Takes a tuple of the table path, the states as (used_mask,
+    upper_total) and the number of dice, sides and rerolls, and
+    reads the values of the later states from the table.
+    
+    Returns a list of (state index, value, advice bytes).
+    """
+    path, states, num_dice, num_die_sides, num_rolls = solve_args
+    num_categories = num_game_categories(num_die_sides)
+    table_file = open(path, 'rb')
+    table = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+    table_file.close()
+    
+    results = []
+    next_rows = {}
+    for used_mask, upper_total in states:
+        
+        # Reads the values of every state after filling one
+        # more category, once per used categories
+        next_values = {}
+        for category in range(num_categories):
+            if not used_mask >> category & 1:
+                next_mask = used_mask | (1 << category)
+                if next_mask not in next_rows:
+                    offset = (struct.calcsize(GAME_TABLE_HEADER) + 8 *
+                              game_state_index(next_mask, 0))
+                    next_rows[next_mask] = list(struct.unpack_from(
+                        '<%dd' % (UPPER_BONUS_THRESHOLD + 1), table, offset))
+                next_values[category] = next_rows[next_mask]
+        
+        value, categories, hold_masks = solve_game_turn(used_mask, upper_total, next_values,
+                                                        num_dice, num_die_sides, num_rolls)
+        advice = bytearray(categories)
+        for masks in hold_masks:
+            advice.extend(masks)
+        results.append((game_state_index(used_mask, upper_total), value, advice))
+    
+    table.close()
+    return results
+
+
+def build_game_table(path, num_dice=5, num_die_sides=6, num_rolls=2, processes=None,
+                     states_per_task=64):
+    """
+    Solves the whole game by backward induction over the
+    scorecard states, the upper and lower categories used and
+    the upper total, and writes the table to path. Every level
+    of states with the same number of categories used is split
+    across a process pool and written before the level before
+    it is solved.
+    """
+    if mmap is None or struct is None:
+        raise ImportError("the game table requires mmap and struct")
+    assert num_dice <= 8, "hold bitmasks are stored in one byte"
+    num_categories = num_game_categories(num_die_sides)
+    num_states = (1 << num_categories) * (UPPER_BONUS_THRESHOLD + 1)
+    num_hands = len(gen_turn_structure(num_dice, num_die_sides)['hands'])
+    advice_size = num_hands * (1 + num_rolls)
+    values_offset = struct.calcsize(GAME_TABLE_HEADER)
+    advice_offset = values_offset + 8 * num_states
+    
+    # Every value starts at zero, the value of a full scorecard
+    table_file = open(path, 'w+b')
+    table_file.write(struct.pack(GAME_TABLE_HEADER, GAME_TABLE_MAGIC, num_dice,
+                                 num_die_sides, num_rolls))
+    table_file.truncate(advice_offset + advice_size * num_states)
+    table_file.flush()
+    
+    if processes == 1 or multiprocessing is None:
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes)
+    
+    # Scorecards by number of categories used, the upper totals
+    # only depending on the upper categories
+    level_masks = [[] for dummy_idx in range(num_categories + 1)]
+    for used_mask in range(1 << num_categories):
+        level_masks[bin(used_mask).count('1')].append(used_mask)
+    upper_totals = [reachable_upper_totals(upper_mask, num_dice, num_die_sides)
+                    for upper_mask in range(1 << num_die_sides)]
+    
+    try:
+        for num_used in range(num_categories - 1, -1, -1):
+            states = []
+            for used_mask in level_masks[num_used]:
+                upper_mask = used_mask & ((1 << num_die_sides) - 1)
+                for upper_total in upper_totals[upper_mask]:
+                    states.append((used_mask, upper_total))
+            tasks = [(path, states[start:start + states_per_task],
+                      num_dice, num_die_sides, num_rolls)
+                     for start in range(0, len(states), states_per_task)]
+            
+            if pool is None:
+                task_results = [solve_game_states(task) for task in tasks]
+            else:
+                task_results = pool.map(solve_game_states, tasks)
+            
+            for results in task_results:
+                for state_idx, value, advice in results:
+                    table_file.seek(values_offset + 8 * state_idx)
+                    table_file.write(struct.pack('<d', value))
+                    table_file.seek(advice_offset + advice_size * state_idx)
+                    table_file.write(advice)
+            table_file.flush()
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        table_file.close()
+
+
+class GameTable:
+    """
+    Class to query a table written by build_game_table through
+    a memory map.
+    """
+    
+    def __init__(self, path):
+        """
+        Maps the table at path.
+        """
+        if mmap is None or struct is None:
+            raise ImportError("the game table requires mmap and struct")
+        table_file = open(path, 'rb')
+        self._table = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+        table_file.close()
+        magic, self._num_dice, self._num_die_sides, self._num_rolls = \
+            struct.unpack_from(GAME_TABLE_HEADER, self._table, 0)
+        assert magic == GAME_TABLE_MAGIC, "not a game table file"
+        
+        structure = gen_turn_structure(self._num_dice, self._num_die_sides)
+        self._hand_index = structure['hand_index']
+        self._num_hands = len(structure['hands'])
+        self._advice_size = self._num_hands * (1 + self._num_rolls)
+        self._values_offset = struct.calcsize(GAME_TABLE_HEADER)
+        self._advice_offset = self._values_offset + 8 * (
+            (1 << num_game_categories(self._num_die_sides)) * (UPPER_BONUS_THRESHOLD + 1))
+    
+    def close(self):
+        """
+        Unmaps the table.
+        """
+        self._table.close()
+    
+    def value(self, used_mask, upper_total):
+        """
+        Returns the expected score of the rest of the game from a
+        scorecard state, the categories used being the bits of
+        used_mask numbered as in category_score.
+        """
+        return struct.unpack_from('<d', self._table, self._values_offset +
+                                  8 * game_state_index(used_mask, upper_total))[0]
+    
+    def optimal_hold(self, used_mask, upper_total, hand, rolls_left):
+        """
+        Returns the dice to hold from a hand with rolls_left
+        rerolls left in a scorecard state, from 1 up to the
+        number of rerolls of the table.
+        """
+        assert 1 <= rolls_left <= self._num_rolls, "no hold advice for rolls_left"
+        hand = tuple(sorted(hand))
+        offset = (self._advice_offset +
+                  self._advice_size * game_state_index(used_mask, upper_total) +
+                  self._num_hands * rolls_left + self._hand_index[hand])
+        mask = ord(self._table[offset])
+        return tuple([hand[idx] for idx in range(len(hand)) if mask >> idx & 1])
+    
+    def best_category(self, used_mask, upper_total, hand):
+        """
+        Returns the category to score a final hand in from a
+        scorecard state, numbered as in category_score.
+        """
+        hand = tuple(sorted(hand))
+        offset = (self._advice_offset +
+                  self._advice_size * game_state_index(used_mask, upper_total) +
+                  self._hand_index[hand])
+        return ord(self._table[offset])
+
+
 def run_example():
     """
     Compute the dice to hold and expected score for an example hand
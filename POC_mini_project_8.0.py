@@ -4,8 +4,15 @@ Mini-max Tic-Tac-Toe Player
 
 import poc_ttt_gui
 import math
+import time
 import poc_ttt_provided as provided
 
+# The memory map is only needed by the perfect play table
+try:
+    import mmap
+except ImportError:
+    mmap = None
+
 # Set timeout, as mini-max can take a long time
 import codeskulptor
 codeskulptor.set_timeout(80)
@@ -15,6 +22,341 @@ SCORES = {provided.PLAYERX: 1,
           provided.DRAW: 0,
           provided.PLAYERO: -1}
 
+# Lines through every square of a flattened board, computed
+# once per dimension
+SQUARE_LINES = {}
+
+# Bitmasks of the lines through every square of a board,
+# computed once per dimension
+WIN_MASKS = {}
+
+# Squares of every row, column and diagonal of a board,
+# computed once per dimension
+BOARD_LINES = {}
+
+# Rotations and reflections of the squares of a board,
+# computed once per dimension
+SYMMETRY_MAPS = {}
+
+# Perfect play table for 3x3 boards: a header followed by one
+# byte per base 3 position index for X to move, then one for O
+# to move. Every byte holds the score plus one in the high
+# four bits and the flattened index of the move in the low
+# four bits, or TABLE_NO_ENTRY for positions never reached.
+TABLE_MAGIC = 'TTT3'
+TABLE_DIM = 3
+TABLE_POSITIONS = 3 ** (TABLE_DIM * TABLE_DIM)
+TABLE_NO_ENTRY = 0xFF
+TABLE_DIGITS = {provided.EMPTY: 0,
+                provided.PLAYERX: 1,
+                provided.PLAYERO: 2}
+
+# Table used by move_wrapper once loaded
+PERFECT_PLAY_TABLE = None
+
+# Characters used to print the squares of a board
+STRMAP = {provided.EMPTY: " ",
+          provided.PLAYERX: "X",
+          provided.PLAYERO: "O"}
+
+def get_square_lines(dim):
+    """
+    Returns a list with, for every flattened square of a board
+    of the given dimension, the list of lines through it.
+    Lines 0 to dim - 1 are the rows, dim to 2 * dim - 1 the
+    columns and the last two the diagonals.
+    """
+    if dim not in SQUARE_LINES:
+        square_lines = []
+        for row in range(dim):
+            for col in range(dim):
+                lines = [row, dim + col]
+                if row == col:
+                    lines.append(2 * dim)
+                if row + col == dim - 1:
+                    lines.append(2 * dim + 1)
+                square_lines.append(lines)
+        SQUARE_LINES[dim] = square_lines
+    return SQUARE_LINES[dim]
+
+def is_reversed(board):
+    """
+    Returns whether a board is a reversed game, as kept in the
+    _reverse attribute of provided.TTTBoard and of the boards
+    below.
+    """
+    return getattr(board, '_reverse', False)
+
+class RolloutBoard:
+    """
+    Class for a tic-tac-toe board with the same methods as
+    provided.TTTBoard that counts the stones of each player on
+    every line as moves are made, so check_win is answered
+    without scanning the board.
+    """
+    
+    def __init__(self, dim, reverse=False, board=None):
+        """
+        Creates a board of the given dimension, either empty or
+        with the squares of a list of lists.
+        """
+        self._dim = dim
+        self._reverse = reverse
+        self._squares = [provided.EMPTY] * (dim * dim)
+        self._square_lines = get_square_lines(dim)
+        self._line_counts = {provided.PLAYERX: [0] * (2 * dim + 2),
+                             provided.PLAYERO: [0] * (2 * dim + 2)}
+        self._num_empty = dim * dim
+        self._winner = None
+        if board != None:
+            for row in range(dim):
+                for col in range(dim):
+                    if board[row][col] != provided.EMPTY:
+                        self.move(row, col, board[row][col])
+    
+    @classmethod
+    def from_board(cls, board, reverse=None):
+        """
+        Creates a rollout board with the squares of another
+        board, reversed like it unless reverse is given.
+        """
+        if reverse == None:
+            reverse = is_reversed(board)
+        dim = board.get_dim()
+        return cls(dim, reverse, [[board.square(row, col) for col in range(dim)]
+                                  for row in range(dim)])
+    
+    def __str__(self):
+        """
+        Returns a string of the board with one row per line.
+        """
+        rep = ""
+        for row in range(self._dim):
+            rep += " | ".join([STRMAP[self.square(row, col)] for col in range(self._dim)])
+            rep += "\n"
+            if row != self._dim - 1:
+                rep += "-" * (4 * self._dim - 3) + "\n"
+        return rep
+    
+    def get_dim(self):
+        """
+        Returns the dimension of the board.
+        """
+        return self._dim
+    
+    def square(self, row, col):
+        """
+        Returns the player on a square or EMPTY.
+        """
+        return self._squares[row * self._dim + col]
+    
+    def get_empty_squares(self):
+        """
+        Returns a list of the (row, col) of the empty squares.
+        """
+        return [divmod(idx, self._dim) for idx, square in enumerate(self._squares)
+                if square == provided.EMPTY]
+    
+    def move(self, row, col, player):
+        """
+        Places player on an empty square and updates the line
+        counts, recording the winner if the move completes a
+        line.
+        """
+        idx = row * self._dim + col
+        if self._squares[idx] != provided.EMPTY:
+            return
+        self._squares[idx] = player
+        self._num_empty -= 1
+        line_counts = self._line_counts[player]
+        for line in self._square_lines[idx]:
+            line_counts[line] += 1
+            if line_counts[line] == self._dim and self._winner == None:
+                if self._reverse:
+                    self._winner = provided.switch_player(player)
+                else:
+                    self._winner = player
+    
+    def check_win(self):
+        """
+        Returns the winner, DRAW if the board is full without a
+        winner or None if the game is not over.
+        """
+        if self._winner != None:
+            return self._winner
+        if self._num_empty == 0:
+            return provided.DRAW
+        return None
+    
+    def clone(self):
+        """
+        Returns a copy of the board.
+        """
+        board_clone = RolloutBoard(self._dim, self._reverse)
+        board_clone._squares = list(self._squares)
+        board_clone._line_counts = {provided.PLAYERX: list(self._line_counts[provided.PLAYERX]),
+                                    provided.PLAYERO: list(self._line_counts[provided.PLAYERO])}
+        board_clone._num_empty = self._num_empty
+        board_clone._winner = self._winner
+        return board_clone
+
+def get_win_masks(dim):
+    """
+    Returns a list with, for every square of a board of the
+    given dimension, the bitmasks of the lines through it. The
+    square (row, col) is bit row * dim + col.
+    """
+    if dim not in WIN_MASKS:
+        line_masks = []
+        for idx in range(dim):
+            line_masks.append(sum([1 << (idx * dim + col) for col in range(dim)]))
+            line_masks.append(sum([1 << (row * dim + idx) for row in range(dim)]))
+        line_masks.append(sum([1 << (idx * dim + idx) for idx in range(dim)]))
+        line_masks.append(sum([1 << (idx * dim + dim - idx - 1) for idx in range(dim)]))
+        WIN_MASKS[dim] = [[mask for mask in line_masks if mask >> square & 1]
+                          for square in range(dim * dim)]
+    return WIN_MASKS[dim]
+
+class TTTBitBoard:
+    """
+    Class for a tic-tac-toe board with the same methods as
+    provided.TTTBoard that stores the stones of each player as
+    the bits of an integer, so a clone copies two integers.
+    """
+    
+    def __init__(self, dim, reverse=False, board=None):
+        """
+        Creates a board of the given dimension, either empty or
+        with the squares of a list of lists.
+        """
+        self._dim = dim
+        self._reverse = reverse
+        self._win_masks = get_win_masks(dim)
+        self._full_mask = (1 << (dim * dim)) - 1
+        self._stones = {provided.PLAYERX: 0, provided.PLAYERO: 0}
+        self._winner = None
+        if board != None:
+            for row in range(dim):
+                for col in range(dim):
+                    if board[row][col] != provided.EMPTY:
+                        self.move(row, col, board[row][col])
+    
+    @classmethod
+    def from_board(cls, board, reverse=None):
+        """
+        Creates a bitboard with the squares of another board,
+        reversed like it unless reverse is given.
+        """
+        if reverse == None:
+            reverse = is_reversed(board)
+        dim = board.get_dim()
+        return cls(dim, reverse, [[board.square(row, col) for col in range(dim)]
+                                  for row in range(dim)])
+    
+    def __str__(self):
+        """
+        Returns a string of the board with one row per line.
+        """
+        rep = ""
+        for row in range(self._dim):
+            rep += " | ".join([STRMAP[self.square(row, col)] for col in range(self._dim)])
+            rep += "\n"
+            if row != self._dim - 1:
+                rep += "-" * (4 * self._dim - 3) + "\n"
+        return rep
+    
+    def get_dim(self):
+        """
+        Returns the dimension of the board.
+        """
+        return self._dim
+    
+    def square(self, row, col):
+        """
+        Returns the player on a square or EMPTY.
+        """
+        bit = 1 << (row * self._dim + col)
+        if self._stones[provided.PLAYERX] & bit:
+            return provided.PLAYERX
+        if self._stones[provided.PLAYERO] & bit:
+            return provided.PLAYERO
+        return provided.EMPTY
+    
+    def get_empty_squares(self):
+        """
+        Returns a list of the (row, col) of the empty squares.
+        """
+        empty_bits = self._full_mask & ~(self._stones[provided.PLAYERX] |
+                                         self._stones[provided.PLAYERO])
+        empty_squares = []
+        while empty_bits:
+            lowest_bit = empty_bits & -empty_bits
+            empty_squares.append(divmod(lowest_bit.bit_length() - 1, self._dim))
+            empty_bits ^= lowest_bit
+        return empty_squares
+    
+    def move(self, row, col, player):
+        """
+        Places player on an empty square, recording the winner
+        if the move completes a line through it.
+        """
+        square = row * self._dim + col
+        bit = 1 << square
+        if (self._stones[provided.PLAYERX] | self._stones[provided.PLAYERO]) & bit:
+            return
+        stones = self._stones[player] | bit
+        self._stones[player] = stones
+        if self._winner == None:
+            for mask in self._win_masks[square]:
+                if stones & mask == mask:
+                    if self._reverse:
+                        self._winner = provided.switch_player(player)
+                    else:
+                        self._winner = player
+                    break
+    
+    def undo_move(self, row, col):
+        """
+        Empties a square, finding the winner again only if the
+        game had been won.
+        """
+        bit = 1 << (row * self._dim + col)
+        for player in (provided.PLAYERX, provided.PLAYERO):
+            self._stones[player] &= ~bit
+        if self._winner != None:
+            self._winner = None
+            for player in (provided.PLAYERX, provided.PLAYERO):
+                stones = self._stones[player]
+                for square_masks in self._win_masks:
+                    for mask in square_masks:
+                        if stones & mask == mask:
+                            if self._reverse:
+                                self._winner = provided.switch_player(player)
+                            else:
+                                self._winner = player
+                            return
+    
+    def check_win(self):
+        """
+        Returns the winner, DRAW if the board is full without a
+        winner or None if the game is not over.
+        """
+        if self._winner != None:
+            return self._winner
+        if self._stones[provided.PLAYERX] | self._stones[provided.PLAYERO] == self._full_mask:
+            return provided.DRAW
+        return None
+    
+    def clone(self):
+        """
+        Returns a copy of the board.
+        """
+        board_clone = TTTBitBoard(self._dim, self._reverse)
+        board_clone._stones = {provided.PLAYERX: self._stones[provided.PLAYERX],
+                               provided.PLAYERO: self._stones[provided.PLAYERO]}
+        board_clone._winner = self._winner
+        return board_clone
+
 def mm_move(board, player):
     """
     Make a move on the board.
@@ -65,12 +407,498 @@ def mm_move(board, player):
                     min_move = dummy_move_score[1]
             return min_score, min_move
 
+def order_moves(board, moves):
+    """
+    Sorts moves with the center squares first, then the
+    corners, then the remaining squares from the center out.
+    """
+    dim = board.get_dim()
+    middle = (dim - 1) / 2.0
+    
+    def move_priority(move):
+        """
+        Returns the sort key of a move.
+        """
+        distance = abs(move[0] - middle) + abs(move[1] - middle)
+        if distance <= 1:
+            return (0, distance)
+        if move[0] in (0, dim - 1) and move[1] in (0, dim - 1):
+            return (1, distance)
+        return (2, distance)
+    
+    return sorted(moves, key=move_priority)
+
+def mm_move_alphabeta(board, player, alpha=float('-inf'), beta=float('+inf')):
+    """
+    Same as mm_move with alpha-beta pruning. Tries the center
+    and corner squares first and stops searching a position as
+    soon as a move is proven to win for the player.
+    
+    Returns a tuple of the score of the board and the desired
+    move as a tuple, (row, col).
+    """
+    
+    # The base case
+    winner = board.check_win()
+    if winner != None:
+        return SCORES[winner], None
+    
+    # Recursive case
+    other_player = provided.switch_player(player)
+    best_move = None
+    if player == provided.PLAYERX:
+        best_score = float('-inf')
+    else:
+        best_score = float('+inf')
+    
+    for move in order_moves(board, board.get_empty_squares()):
+        board_clone = board.clone()
+        board_clone.move(move[0], move[1], player)
+        score = mm_move_alphabeta(board_clone, other_player, alpha, beta)[0]
+        
+        if player == provided.PLAYERX:
+            if score > best_score:
+                best_score = score
+                best_move = move
+            alpha = max(alpha, best_score)
+        else:
+            if score < best_score:
+                best_score = score
+                best_move = move
+            beta = min(beta, best_score)
+        
+        # Nothing beats a proven win, and the opponent will not
+        # allow a position outside the window
+        if best_score == SCORES[player] or alpha >= beta:
+            break
+    
+    return best_score, best_move
+
+def get_symmetry_maps(dim):
+    """
+    Returns a list with a pair of lists for each of the 8
+    rotations and reflections of a board of the given
+    dimension. The first list maps every flattened square of
+    the transformed board to the square of the original board
+    it comes from, the second list is its inverse.
+    """
+    if dim not in SYMMETRY_MAPS:
+        last = dim - 1
+        transforms = [lambda row, col: (row, col),
+                      lambda row, col: (col, last - row),
+                      lambda row, col: (last - row, last - col),
+                      lambda row, col: (last - col, row),
+                      lambda row, col: (row, last - col),
+                      lambda row, col: (last - row, col),
+                      lambda row, col: (col, row),
+                      lambda row, col: (last - col, last - row)]
+        symmetry_maps = []
+        for transform in transforms:
+            forward = []
+            for row in range(dim):
+                for col in range(dim):
+                    from_row, from_col = transform(row, col)
+                    forward.append(from_row * dim + from_col)
+            inverse = [0] * (dim * dim)
+            for idx, from_idx in enumerate(forward):
+                inverse[from_idx] = idx
+            symmetry_maps.append((forward, inverse))
+        SYMMETRY_MAPS[dim] = symmetry_maps
+    return SYMMETRY_MAPS[dim]
+
+def canonical_position(board, player):
+    """
+    Returns the key of a position that is the same for every
+    rotation and reflection of the board, with the pair of
+    square maps of the transform that gives it. Reversed games
+    have keys of their own.
+    """
+    dim = board.get_dim()
+    squares = [board.square(row, col) for row in range(dim) for col in range(dim)]
+    best_key = None
+    best_maps = None
+    for maps in get_symmetry_maps(dim):
+        key = tuple([squares[idx] for idx in maps[0]])
+        if best_key == None or key < best_key:
+            best_key = key
+            best_maps = maps
+    return (player, is_reversed(board), best_key), best_maps
+
+class TranspositionTable:
+    """
+    Class to store the score and best move of solved positions
+    under their canonical key, counting hits and misses.
+    """
+    
+    def __init__(self):
+        self._entries = {}
+        self._hits = 0
+        self._misses = 0
+    
+    def lookup(self, key):
+        """
+        Returns the (score, move index) stored for a key or None.
+        """
+        entry = self._entries.get(key)
+        if entry == None:
+            self._misses += 1
+        else:
+            self._hits += 1
+        return entry
+    
+    def store(self, key, score, move_idx):
+        """
+        Stores the score and the flattened index of the best
+        move of a position.
+        """
+        self._entries[key] = (score, move_idx)
+    
+    def clear(self):
+        """
+        Removes every entry and resets the counters.
+        """
+        self._entries = {}
+        self._hits = 0
+        self._misses = 0
+    
+    def get_hits(self):
+        """
+        Returns the number of lookups that found an entry.
+        """
+        return self._hits
+    
+    def get_misses(self):
+        """
+        Returns the number of lookups that found no entry.
+        """
+        return self._misses
+    
+    def get_size(self):
+        """
+        Returns the number of stored positions.
+        """
+        return len(self._entries)
+
+def mm_move_cached(board, player, table=None):
+    """
+    Same as mm_move, storing every solved position in a
+    transposition table under its canonical key so positions
+    reached by other move orders or by a rotation or reflection
+    are only solved once. Stops searching a position as soon as
+    a move is proven to win for the player. Every call without
+    a table searches with a new one, a table passed in is kept
+    between calls.
+    
+    Returns a tuple of the score of the board and the desired
+    move as a tuple, (row, col).
+    """
+    
+    # The base case
+    winner = board.check_win()
+    if winner != None:
+        return SCORES[winner], None
+    
+    if table == None:
+        table = TranspositionTable()
+    
+    # Maps the stored move back from the canonical board
+    dim = board.get_dim()
+    key, (forward, inverse) = canonical_position(board, player)
+    entry = table.lookup(key)
+    if entry != None:
+        return entry[0], divmod(forward[entry[1]], dim)
+    
+    # Recursive case
+    other_player = provided.switch_player(player)
+    best_move = None
+    best_score = None
+    for move in board.get_empty_squares():
+        board_clone = board.clone()
+        board_clone.move(move[0], move[1], player)
+        score = mm_move_cached(board_clone, other_player, table)[0]
+        if (best_score == None or SCORES[player] * score > SCORES[player] * best_score):
+            best_score = score
+            best_move = move
+            if best_score == SCORES[player]:
+                break
+    
+    table.store(key, best_score, inverse[best_move[0] * dim + best_move[1]])
+    return best_score, best_move
+
+class SearchTimeout(Exception):
+    """
+    Raised inside the search when the time budget of the
+    current move runs out.
+    """
+    pass
+
+def get_board_lines(dim):
+    """
+    Returns the list of the (row, col) squares of every row,
+    column and diagonal of a board of the given dimension.
+    """
+    if dim not in BOARD_LINES:
+        lines = []
+        for idx in range(dim):
+            lines.append([(idx, col) for col in range(dim)])
+            lines.append([(row, idx) for row in range(dim)])
+        lines.append([(idx, idx) for idx in range(dim)])
+        lines.append([(idx, dim - idx - 1) for idx in range(dim)])
+        BOARD_LINES[dim] = lines
+    return BOARD_LINES[dim]
+
+def open_lines_evaluator(board):
+    """
+    Static evaluation of a board that is not over, from the
+    point of view of PLAYERX: the lines only X has stones on
+    minus the lines only O has stones on, scaled to stay
+    strictly between the scores of a loss and a win.
+    """
+    lines = get_board_lines(board.get_dim())
+    open_lines = 0
+    for line in lines:
+        players = set([board.square(row, col) for row, col in line])
+        players.discard(provided.EMPTY)
+        if players == set([provided.PLAYERX]):
+            open_lines += 1
+        elif players == set([provided.PLAYERO]):
+            open_lines -= 1
+    return open_lines / (2.0 * len(lines))
+
+def mm_search_depth(board, player, depth, alpha, beta, evaluator, deadline, first_move=None):
+    """
+    Alpha-beta search of the board limited to depth moves,
+    scoring the positions at the depth limit with evaluator.
+    Searches first_move first if given. Raises SearchTimeout
+    once the deadline has passed.
+    
+    Returns a tuple of the score of the board and the desired
+    move as a tuple, (row, col).
+    """
+    winner = board.check_win()
+    if winner != None:
+        return SCORES[winner], None
+    if depth == 0:
+        return evaluator(board), None
+    if deadline != None and time.time() > deadline:
+        raise SearchTimeout()
+    
+    moves = order_moves(board, board.get_empty_squares())
+    if first_move != None:
+        moves.remove(first_move)
+        moves.insert(0, first_move)
+    
+    other_player = provided.switch_player(player)
+    best_move = None
+    if player == provided.PLAYERX:
+        best_score = float('-inf')
+    else:
+        best_score = float('+inf')
+    
+    for move in moves:
+        board_clone = board.clone()
+        board_clone.move(move[0], move[1], player)
+        score = mm_search_depth(board_clone, other_player, depth - 1,
+                                alpha, beta, evaluator, deadline)[0]
+        if player == provided.PLAYERX:
+            if score > best_score:
+                best_score = score
+                best_move = move
+            alpha = max(alpha, best_score)
+        else:
+            if score < best_score:
+                best_score = score
+                best_move = move
+            beta = min(beta, best_score)
+        if best_score == SCORES[player] or alpha >= beta:
+            break
+    
+    return best_score, best_move
+
+def mm_move_iterative(board, player, time_budget=1.0, evaluator=open_lines_evaluator):
+    """
+    Same as mm_move on boards too large to search to the end.
+    Searches one move deeper at a time, scoring the positions
+    at the depth limit with evaluator, until time_budget
+    seconds have passed or the search reaches the end of the
+    game. The first iteration always completes.
+    
+    Returns a tuple of the score and move of the deepest search
+    that completed.
+    """
+    deadline = time.time() + time_budget
+    num_empty = len(board.get_empty_squares())
+    result = mm_search_depth(board, player, 1, float('-inf'), float('+inf'),
+                             evaluator, None)
+    
+    for depth in range(2, num_empty + 1):
+        
+        # A proven result will not change with a deeper search
+        if result[0] in (SCORES[provided.PLAYERX], SCORES[provided.PLAYERO]):
+            break
+        try:
+            result = mm_search_depth(board, player, depth, float('-inf'), float('+inf'),
+                                     evaluator, deadline, result[1])
+        except SearchTimeout:
+            break
+    
+    return result
+
+def mm_search_inplace(board, player):
+    """
+    Same as mm_move, making every move on the board itself and
+    undoing it after searching it, so no board is copied. The
+    board must have an undo_move method.
+    """
+    winner = board.check_win()
+    if winner != None:
+        return SCORES[winner], None
+    
+    other_player = provided.switch_player(player)
+    best_score = None
+    best_move = None
+    for move in board.get_empty_squares():
+        board.move(move[0], move[1], player)
+        score = mm_search_inplace(board, other_player)[0]
+        board.undo_move(move[0], move[1])
+        if best_score == None or SCORES[player] * score > SCORES[player] * best_score:
+            best_score = score
+            best_move = move
+            
+            # Nothing beats a win, so the first one is the move
+            # mm_move would pick
+            if best_score == SCORES[player]:
+                break
+    
+    return best_score, best_move
+
+def mm_move_inplace(board, player):
+    """
+    Same as mm_move with a single mutable board for the whole
+    search. A TTTBitBoard is searched directly and left as it
+    was, any other board is copied into one TTTBitBoard first,
+    reversed like it.
+    """
+    if not isinstance(board, TTTBitBoard):
+        board = TTTBitBoard.from_board(board, is_reversed(board))
+    return mm_search_inplace(board, player)
+
+def mm_move_rollout(board, player):
+    """
+    Same as mm_move, searching on a RolloutBoard copy of the
+    board so every position is checked for a win without
+    scanning it.
+    """
+    return mm_move(RolloutBoard.from_board(board), player)
+
+def mm_move_bitboard(board, player):
+    """
+    Same as mm_move, searching on a TTTBitBoard copy of the
+    board so every child is a copy of two integers.
+    """
+    return mm_move(TTTBitBoard.from_board(board), player)
+
+def position_index(board):
+    """
+    Returns the base 3 index of a board, the first square
+    being the lowest digit.
+    """
+    index = 0
+    for row in range(board.get_dim() - 1, -1, -1):
+        for col in range(board.get_dim() - 1, -1, -1):
+            index = 3 * index + TABLE_DIGITS[board.square(row, col)]
+    return index
+
+def solve_reachable(board, player, solved):
+    """
+    Solves the board and every position reachable from it with
+    mm_move semantics, storing the (score, move) of each
+    position in solved under its (index, player).
+    """
+    key = (position_index(board), player)
+    if key in solved:
+        return solved[key][0]
+    winner = board.check_win()
+    if winner != None:
+        return SCORES[winner]
+    
+    # Keeps the first of the best moves like mm_move, after a
+    # win the other moves are only searched to solve them too
+    other_player = provided.switch_player(player)
+    best_score = None
+    best_move = None
+    for move in board.get_empty_squares():
+        board_clone = board.clone()
+        board_clone.move(move[0], move[1], player)
+        score = solve_reachable(board_clone, other_player, solved)
+        if best_score == None or SCORES[player] * score > SCORES[player] * best_score:
+            best_score = score
+            best_move = move
+    
+    solved[key] = (best_score, best_move)
+    return best_score
+
+def generate_perfect_play_table(path):
+    """
+    Solves every 3x3 position reachable from the empty board
+    with either player starting and writes the table to path.
+    The table is for normal games only, not reversed ones.
+    """
+    solved = {}
+    for player in (provided.PLAYERX, provided.PLAYERO):
+        solve_reachable(provided.TTTBoard(TABLE_DIM), player, solved)
+    
+    table = bytearray([TABLE_NO_ENTRY] * (2 * TABLE_POSITIONS))
+    for (index, player), (score, move) in solved.items():
+        if player == provided.PLAYERO:
+            index += TABLE_POSITIONS
+        table[index] = ((score + 1) << 4) | (move[0] * TABLE_DIM + move[1])
+    
+    table_file = open(path, 'wb')
+    table_file.write(TABLE_MAGIC)
+    table_file.write(table)
+    table_file.close()
+
+def load_perfect_play_table(path):
+    """
+    Memory maps the table written by generate_perfect_play_table
+    so that move_wrapper answers 3x3 normal games from it.
+    """
+    global PERFECT_PLAY_TABLE
+    if mmap is None:
+        raise ImportError("the perfect play table requires mmap")
+    table_file = open(path, 'rb')
+    table = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+    table_file.close()
+    assert table[:len(TABLE_MAGIC)] == TABLE_MAGIC, "not a perfect play table"
+    PERFECT_PLAY_TABLE = table
+
+def table_move(table, board, player):
+    """
+    Returns the (score, move) of a 3x3 board from a perfect play
+    table, or None if the position is not in the table.
+    """
+    index = len(TABLE_MAGIC) + position_index(board)
+    if player == provided.PLAYERO:
+        index += TABLE_POSITIONS
+    entry = ord(table[index])
+    if entry == TABLE_NO_ENTRY:
+        return None
+    return (entry >> 4) - 1, divmod(entry & 0xF, TABLE_DIM)
+
 def move_wrapper(board, player, trials):
     """
     Wrapper to allow the use of the same infrastructure that was used
-    for Monte Carlo Tic-Tac-Toe.
+    for Monte Carlo Tic-Tac-Toe. Answers from the perfect play
+    table when one is loaded, except for reversed games that
+    the table was not solved for.
     """
-    move = mm_move(board, player)
+    move = None
+    if (PERFECT_PLAY_TABLE != None and board.get_dim() == TABLE_DIM and
+            not is_reversed(board)):
+        move = table_move(PERFECT_PLAY_TABLE, board, player)
+    if move == None:
+        move = mm_move(board, player)
     assert move[1] != (-1, -1), "returned illegal move (-1, -1)"
     return move[1]
 